@@ -3,11 +3,15 @@ Authentication module for Saphire AI.
 """
 
 from app.auth.dependencies import (
+    get_current_admin_principal,
     get_current_admin_user,
     get_current_active_user,
+    get_current_principal,
     get_current_user,
+    get_current_verified_principal,
     get_current_verified_user,
     optional_current_user,
+    require_metrics_access,
 )
 from app.auth.jwt_handler import (
     create_access_token,
@@ -15,14 +19,24 @@ from app.auth.jwt_handler import (
     create_token_pair,
     decode_token,
     verify_access_token,
+    verify_access_token_claims,
     verify_refresh_token,
 )
-from app.auth.password import hash_password, validate_password_strength, verify_password
+from app.auth.password import (
+    hash_password,
+    hash_password_async,
+    validate_password_strength,
+    verify_password,
+    verify_password_async,
+)
+from app.auth.principal import Principal, principal_claims
 
 __all__ = [
     # Password utilities
     "hash_password",
+    "hash_password_async",
     "verify_password",
+    "verify_password_async",
     "validate_password_strength",
     # JWT utilities
     "create_access_token",
@@ -30,11 +44,19 @@ __all__ = [
     "create_token_pair",
     "decode_token",
     "verify_access_token",
+    "verify_access_token_claims",
     "verify_refresh_token",
+    # Principal
+    "Principal",
+    "principal_claims",
     # Dependencies
     "get_current_user",
     "get_current_active_user",
     "get_current_verified_user",
     "get_current_admin_user",
     "optional_current_user",
+    "get_current_principal",
+    "get_current_verified_principal",
+    "get_current_admin_principal",
+    "require_metrics_access",
 ]
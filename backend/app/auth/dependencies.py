@@ -2,6 +2,7 @@
 Authentication dependencies for FastAPI routes.
 """
 
+import hmac
 from typing import Optional
 from uuid import UUID
 
@@ -9,10 +10,14 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.jwt_handler import verify_access_token
-from app.database import get_async_db
+from app.auth.jwt_handler import verify_access_token_claims
+from app.auth.principal import Principal
+from app.auth.principal_cache import principal_cache
+from app.config import get_settings
+from app.database import get_async_db, track_user_writes
 from app.models.user import User
-from app.services.user_service import UserService
+
+settings = get_settings()
 
 # Security scheme
 security = HTTPBearer(auto_error=False)
@@ -45,31 +50,167 @@ async def get_current_user(
         raise credentials_exception
     
     token = credentials.credentials
-    user_id = verify_access_token(token)
+    payload = verify_access_token_claims(token)
     
-    if user_id is None:
+    if payload is None:
         raise credentials_exception
     
     try:
-        user_uuid = UUID(user_id)
-    except ValueError:
+        user_uuid = UUID(payload.get("sub"))
+    except (TypeError, ValueError):
         raise credentials_exception
     
+    # Imported here: app.services imports app.auth through user_service
+    from app.services.user_service import UserService
+    
     user_service = UserService(db)
-    user = await user_service.get_by_id(user_uuid)
+    user = await user_service.get_for_principal(user_uuid, payload.get("iat"))
     
     if user is None:
         raise credentials_exception
     
+    # Tokens carrying claims from before a token version bump are stale
+    token_version = payload.get("tv")
+    if token_version is not None and token_version < user.token_version:
+        raise credentials_exception
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
     
+    track_user_writes(db, user.id)
     return user
 
 
+async def get_current_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Get the current authenticated principal from token claims.
+    
+    Authorizes without a database query. Tokens issued before claims were
+    embedded fall back to loading the user.
+    
+    Tokens older than the user's token version are rejected at once by the
+    process that bumped it (deactivation, deletion, password change). Other
+    processes learn of the bump from the revocation sync, so they keep
+    accepting such tokens for up to ``REVOCATION_SYNC_SECONDS``.
+    
+    Args:
+        credentials: The HTTP Authorization credentials.
+        db: Database session, only used for tokens without claims.
+    
+    Returns:
+        The authenticated Principal.
+    
+    Raises:
+        HTTPException: If authentication fails.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    if not credentials:
+        raise credentials_exception
+    
+    payload = verify_access_token_claims(credentials.credentials)
+    if payload is None:
+        raise credentials_exception
+    
+    principal = Principal.from_claims(payload)
+    if principal is None:
+        user = await get_current_user(credentials, db)
+        return Principal.from_user(user)
+    
+    if principal.token_version < principal_cache.min_token_version(principal.id):
+        raise credentials_exception
+    
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
+    track_user_writes(db, principal.id)
+    return principal
+
+
+async def get_current_verified_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """
+    Get the current verified principal.
+    
+    Args:
+        principal: The current authenticated principal.
+    
+    Returns:
+        The verified Principal.
+    
+    Raises:
+        HTTPException: If the user is not verified.
+    """
+    if not principal.is_verified:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Email not verified"
+        )
+    return principal
+
+
+async def get_current_admin_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """
+    Get the current admin principal.
+    
+    Args:
+        principal: The current authenticated principal.
+    
+    Returns:
+        The admin Principal.
+    
+    Raises:
+        HTTPException: If the user is not an admin.
+    """
+    if not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return principal
+
+
+async def require_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> None:
+    """
+    Allow admins, or scrapers presenting ``METRICS_TOKEN``, to read metrics.
+    
+    Args:
+        credentials: The HTTP Authorization credentials.
+        db: Database session, only used for tokens without claims.
+    
+    Raises:
+        HTTPException: If the caller is neither.
+    """
+    if (
+        settings.METRICS_TOKEN
+        and credentials is not None
+        and hmac.compare_digest(credentials.credentials.encode(), settings.METRICS_TOKEN.encode())
+    ):
+        return
+    
+    principal = await get_current_principal(credentials, db)
+    await get_current_admin_principal(principal)
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -158,16 +299,18 @@ async def optional_current_user(
     if not credentials:
         return None
     
+    from app.services.user_service import UserService
+    
     try:
         token = credentials.credentials
-        user_id = verify_access_token(token)
+        payload = verify_access_token_claims(token)
         
-        if user_id is None:
+        if payload is None:
             return None
         
-        user_uuid = UUID(user_id)
+        user_uuid = UUID(payload.get("sub"))
         user_service = UserService(db)
-        user = await user_service.get_by_id(user_uuid)
+        user = await user_service.get_for_principal(user_uuid, payload.get("iat"))
         
         if user and user.is_active:
             return user
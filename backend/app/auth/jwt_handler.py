@@ -4,18 +4,42 @@ JWT token generation and validation utilities.
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from jose import JWTError, jwt
 
+from app.auth.keys import get_token_keys
+from app.auth.revocation import revocation_store
 from app.config import get_settings
 
 settings = get_settings()
 
 
+def _encode(claims: dict) -> str:
+    """Sign claims with the cached signing key."""
+    keys = get_token_keys()
+    return jwt.encode(
+        claims,
+        keys.signing_key,
+        algorithm=keys.algorithm,
+        headers=keys.headers
+    )
+
+
+def _decode(token: str) -> dict:
+    """Verify and decode a token with the cached verification keys."""
+    keys = get_token_keys()
+    return jwt.decode(
+        token,
+        keys.key_for(token),
+        algorithms=[keys.algorithm]
+    )
+
+
 def create_access_token(
     user_id: str | UUID,
-    expires_delta: Optional[timedelta] = None
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[dict] = None
 ) -> str:
     """
     Create a JWT access token for a user.
@@ -23,6 +47,7 @@ def create_access_token(
     Args:
         user_id: The user's ID.
         expires_delta: Optional custom expiration time.
+        claims: Optional extra claims, e.g. from ``principal_claims``.
     
     Returns:
         The encoded JWT token string.
@@ -37,19 +62,18 @@ def create_access_token(
         "exp": expire,
         "type": "access",
         "iat": datetime.now(timezone.utc),
+        "jti": uuid4().hex,
     }
+    if claims:
+        to_encode.update(claims)
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    return _encode(to_encode)
 
 
 def create_refresh_token(
     user_id: str | UUID,
-    expires_delta: Optional[timedelta] = None
+    expires_delta: Optional[timedelta] = None,
+    token_version: Optional[int] = None
 ) -> str:
     """
     Create a JWT refresh token for a user.
@@ -57,6 +81,7 @@ def create_refresh_token(
     Args:
         user_id: The user's ID.
         expires_delta: Optional custom expiration time.
+        token_version: The user's token version, checked on refresh.
     
     Returns:
         The encoded JWT refresh token string.
@@ -71,14 +96,12 @@ def create_refresh_token(
         "exp": expire,
         "type": "refresh",
         "iat": datetime.now(timezone.utc),
+        "jti": uuid4().hex,
     }
+    if token_version is not None:
+        to_encode["tv"] = token_version
     
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    return _encode(to_encode)
 
 
 def decode_token(token: str) -> Optional[dict]:
@@ -92,25 +115,20 @@ def decode_token(token: str) -> Optional[dict]:
         The decoded token payload if valid, None otherwise.
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
+        return _decode(token)
     except JWTError:
         return None
 
 
-def verify_access_token(token: str) -> Optional[str]:
+def verify_access_token_claims(token: str) -> Optional[dict]:
     """
-    Verify an access token and return the user ID.
+    Verify an access token and return its claims.
     
     Args:
         token: The access token to verify.
     
     Returns:
-        The user ID if the token is valid, None otherwise.
+        The token payload if the token is a valid access token, None otherwise.
     """
     payload = decode_token(token)
     if payload is None:
@@ -120,19 +138,41 @@ def verify_access_token(token: str) -> Optional[str]:
     if payload.get("type") != "access":
         return None
     
+    if revocation_store.is_revoked(payload.get("jti")):
+        return None
+    
+    return payload
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    """
+    Verify an access token and return the user ID.
+    
+    Args:
+        token: The access token to verify.
+    
+    Returns:
+        The user ID if the token is valid, None otherwise.
+    """
+    payload = verify_access_token_claims(token)
+    if payload is None:
+        return None
+    
     user_id: str = payload.get("sub")
     return user_id
 
 
-def verify_refresh_token(token: str) -> Optional[str]:
+def verify_refresh_token(token: str) -> Optional[dict]:
     """
-    Verify a refresh token and return the user ID.
+    Verify a refresh token and return its payload.
+    
+    The caller checks the ``tv`` claim against the user's token version.
     
     Args:
         token: The refresh token to verify.
     
     Returns:
-        The user ID if the token is valid, None otherwise.
+        The token payload if the token is valid, None otherwise.
     """
     payload = decode_token(token)
     if payload is None:
@@ -142,8 +182,10 @@ def verify_refresh_token(token: str) -> Optional[str]:
     if payload.get("type") != "refresh":
         return None
     
-    user_id: str = payload.get("sub")
-    return user_id
+    if revocation_store.is_revoked(payload.get("jti")):
+        return None
+    
+    return payload
 
 
 def get_token_expiry(token: str) -> Optional[datetime]:
@@ -157,11 +199,7 @@ def get_token_expiry(token: str) -> Optional[datetime]:
         The expiration datetime if valid, None otherwise.
     """
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = _decode(token)
         exp = payload.get("exp")
         if exp:
             return datetime.fromtimestamp(exp, tz=timezone.utc)
@@ -170,18 +208,20 @@ def get_token_expiry(token: str) -> Optional[datetime]:
         return None
 
 
-def create_token_pair(user_id: str | UUID) -> dict:
+def create_token_pair(user_id: str | UUID, claims: Optional[dict] = None) -> dict:
     """
     Create both access and refresh tokens for a user.
     
     Args:
         user_id: The user's ID.
+        claims: Optional extra claims for the access token; their token
+            version (``tv``) is also put in the refresh token.
     
     Returns:
         Dictionary containing access_token, refresh_token, token_type, and expires_in.
     """
-    access_token = create_access_token(user_id)
-    refresh_token = create_refresh_token(user_id)
+    access_token = create_access_token(user_id, claims=claims)
+    refresh_token = create_refresh_token(user_id, token_version=(claims or {}).get("tv"))
     
     return {
         "access_token": access_token,
@@ -0,0 +1,106 @@
+"""
+JWT signing and verification keys.
+
+Key material is parsed once per process. HS* algorithms sign with the
+shared ``SECRET_KEY``; RS* algorithms sign with a private key identified by
+``JWT_KEY_ID`` and publish the public keys as a JWKS so other services can
+verify tokens locally.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWTError
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class TokenKeys:
+    """Parsed signing key and the keys accepted for verification."""
+    
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key: Key,
+        key_id: Optional[str] = None,
+        verification_keys: Optional[dict[str, Key]] = None,
+    ):
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.key_id = key_id
+        self.verification_keys = verification_keys or {}
+    
+    @property
+    def is_asymmetric(self) -> bool:
+        """Check whether tokens are signed with a private key."""
+        return self.key_id is not None
+    
+    @property
+    def headers(self) -> Optional[dict[str, str]]:
+        """Extra JOSE headers for newly signed tokens."""
+        if self.key_id is None:
+            return None
+        return {"kid": self.key_id}
+    
+    def key_for(self, token: str) -> Key:
+        """
+        Get the key that should verify a token.
+        
+        Raises:
+            JWTError: If the token names an unknown key.
+        """
+        if not self.is_asymmetric:
+            return self.signing_key
+        
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.verification_keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return key
+    
+    def jwks(self) -> dict[str, Any]:
+        """Get the public verification keys as a JWK Set."""
+        keys = []
+        for kid, key in self.verification_keys.items():
+            jwk_dict = key.to_dict()
+            jwk_dict.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(jwk_dict)
+        return {"keys": keys}
+
+
+def _parse_key_files(value: str) -> dict[str, str]:
+    """Parse ``kid=path`` pairs from a comma-separated setting."""
+    entries = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kid, _, path = entry.partition("=")
+        entries[kid.strip()] = path.strip()
+    return entries
+
+
+@lru_cache()
+def get_token_keys() -> TokenKeys:
+    """Get cached token keys built from settings."""
+    algorithm = settings.ALGORITHM
+    
+    if algorithm.startswith("HS"):
+        return TokenKeys(algorithm, jwk.construct(settings.SECRET_KEY, algorithm))
+    
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise RuntimeError(f"JWT_PRIVATE_KEY_FILE is required for {algorithm}")
+    
+    signing_key = jwk.construct(Path(settings.JWT_PRIVATE_KEY_FILE).read_text(), algorithm)
+    verification_keys = {settings.JWT_KEY_ID: signing_key.public_key()}
+    
+    # Retired keys stay valid for verification until their tokens expire
+    for kid, path in _parse_key_files(settings.JWT_PUBLIC_KEY_FILES).items():
+        verification_keys.setdefault(kid, jwk.construct(Path(path).read_text(), algorithm))
+    
+    return TokenKeys(algorithm, signing_key, settings.JWT_KEY_ID, verification_keys)
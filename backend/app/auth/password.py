@@ -3,12 +3,126 @@ Password hashing and verification utilities.
 Uses passlib with bcrypt for secure password handling.
 """
 
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
 from passlib.context import CryptContext
 
+from app.config import get_settings
+from app.exceptions import ServiceBusyException
+from app.metrics import register_stats
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 # Password hashing context with bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class PasswordHashingPool:
+    """
+    Bounded thread pool for bcrypt work.
+    
+    bcrypt releases the GIL while hashing, so a small thread pool keeps the
+    event loop responsive. Work beyond ``max_pending`` queued or running
+    operations is rejected instead of piling up behind slow hashes.
+    """
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        # Timings are added from the worker threads
+        self._timing_lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+    
+    @property
+    def pending(self) -> int:
+        """Number of operations queued or running."""
+        return self._pending
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash",
+            )
+        return self._executor
+    
+    def _timed(self, func: Callable[..., T], args: tuple, submitted_at: float) -> T:
+        started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            with self._timing_lock:
+                self.total_wait_seconds += started_at - submitted_at
+                self.total_run_seconds += finished_at - started_at
+    
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a hashing function in the pool.
+        
+        Raises:
+            ServiceBusyException: If the pool's queue is full.
+        """
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ServiceBusyException("Too many authentication requests, please retry")
+        
+        self._pending += 1
+        self.submitted += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), self._timed, func, args, time.perf_counter()
+            )
+        finally:
+            self._pending -= 1
+            self.completed += 1
+    
+    def shutdown(self) -> None:
+        """Shut down the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def stats(self) -> dict[str, Any]:
+        """Get pool counters."""
+        with self._timing_lock:
+            total_wait_seconds = self.total_wait_seconds
+            total_run_seconds = self.total_run_seconds
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(total_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "avg_run_ms": round(total_run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+        }
+
+
+password_hashing_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+register_stats("password_hashing", password_hashing_pool.stats)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
@@ -36,6 +150,147 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password in the hashing pool without blocking the event loop.
+    
+    Args:
+        plain_password: The plain text password to verify.
+        hashed_password: The hashed password to verify against.
+    
+    Returns:
+        True if the password matches, False otherwise.
+    
+    Raises:
+        ServiceBusyException: If the hashing pool is saturated.
+    """
+    return await password_hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password in the hashing pool without blocking the event loop.
+    
+    Args:
+        password: The plain text password to hash.
+    
+    Returns:
+        The hashed password string.
+    
+    Raises:
+        ServiceBusyException: If the hashing pool is saturated.
+    """
+    return await password_hashing_pool.run(hash_password, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash uses a cost outside the accepted range.
+    
+    Args:
+        hashed_password: The stored password hash.
+    
+    Returns:
+        True if the password should be rehashed, False otherwise.
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float,
+    min_rounds: int,
+    max_rounds: int,
+    samples: int = 3,
+) -> int:
+    """
+    Find the bcrypt cost that keeps a verify within a latency target.
+    
+    Times a verify at ``min_rounds`` and doubles the estimate per extra
+    round, since each bcrypt round doubles the work.
+    
+    Args:
+        target_ms: Target verify latency in milliseconds.
+        min_rounds: Lowest acceptable cost.
+        max_rounds: Highest acceptable cost.
+        samples: Number of timed verifies to take the median of.
+    
+    Returns:
+        The largest cost whose estimated verify time fits the target.
+    """
+    handler = pwd_context.handler("bcrypt").using(rounds=min_rounds)
+    probe = handler.hash("calibration-probe")
+    
+    timings = []
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        handler.verify("calibration-probe", probe)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    
+    estimate_ms = statistics.median(timings)
+    rounds = min_rounds
+    while rounds < max_rounds and estimate_ms * 2 <= target_ms:
+        estimate_ms *= 2
+        rounds += 1
+    return rounds
+
+
+def configure_bcrypt_rounds(
+    rounds: int,
+    min_rounds: Optional[int] = None,
+    max_rounds: Optional[int] = None,
+) -> None:
+    """
+    Set the bcrypt cost for new hashes and the range accepted for stored ones.
+    
+    Hashes with a cost outside ``min_rounds``..``max_rounds`` are reported by
+    ``password_needs_rehash`` and rehashed at ``rounds`` on the next login.
+    
+    Args:
+        rounds: Cost for new hashes.
+        min_rounds: Lowest accepted cost; defaults to ``rounds``.
+        max_rounds: Highest accepted cost; defaults to ``rounds``.
+    """
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds if min_rounds is None else min_rounds,
+        bcrypt__max_rounds=rounds if max_rounds is None else max_rounds,
+    )
+
+
+async def tune_password_hashing() -> Optional[int]:
+    """
+    Configure the bcrypt cost at startup.
+    
+    Uses ``BCRYPT_ROUNDS`` when set; stored hashes with another cost are
+    rehashed on login. Otherwise calibrates against ``BCRYPT_TARGET_MS``
+    on the current CPU. Workers calibrate separately and may disagree, so
+    a calibrated cost only applies to new hashes and stored ones are
+    rehashed only outside ``BCRYPT_MIN_ROUNDS``..``BCRYPT_MAX_ROUNDS``.
+    ``scripts.calibrate_bcrypt`` calibrates once for a shared
+    ``BCRYPT_ROUNDS``. A target of 0 keeps passlib's default cost and
+    disables rehashing on login.
+    
+    Returns:
+        The configured cost, or None if left at the default.
+    """
+    if settings.BCRYPT_ROUNDS is not None:
+        rounds = settings.BCRYPT_ROUNDS
+        configure_bcrypt_rounds(rounds)
+    elif settings.BCRYPT_TARGET_MS > 0:
+        rounds = await password_hashing_pool.run(
+            calibrate_bcrypt_rounds,
+            settings.BCRYPT_TARGET_MS,
+            settings.BCRYPT_MIN_ROUNDS,
+            settings.BCRYPT_MAX_ROUNDS,
+        )
+        configure_bcrypt_rounds(rounds, settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS)
+    else:
+        return None
+    
+    logger.info("Using bcrypt cost %d", rounds)
+    return rounds
+
+
 def validate_password_strength(password: str) -> tuple[bool, str]:
     """
     Validate password strength.
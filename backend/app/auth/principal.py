@@ -0,0 +1,80 @@
+"""
+Authenticated principal built from access token claims.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+from uuid import UUID
+
+from app.models.user import User, UserRole
+
+# Version of the claim layout embedded in access tokens
+CLAIMS_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identity and authorization attributes of the current caller."""
+    
+    id: UUID
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+    token_version: int
+    
+    @property
+    def is_admin(self) -> bool:
+        """Check whether the principal has admin privileges."""
+        return self.role == UserRole.ADMIN
+    
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        """Build a principal from a loaded user."""
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+            token_version=user.token_version,
+        )
+    
+    @classmethod
+    def from_claims(cls, payload: dict[str, Any]) -> Optional["Principal"]:
+        """
+        Build a principal from access token claims.
+        
+        Returns:
+            The principal, or None if the token predates the claim layout.
+        """
+        if payload.get("cv") != CLAIMS_VERSION:
+            return None
+        
+        try:
+            return cls(
+                id=UUID(payload["sub"]),
+                role=UserRole(payload["role"]),
+                is_active=bool(payload["act"]),
+                is_verified=bool(payload["vfd"]),
+                token_version=int(payload["tv"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+def principal_claims(user: User) -> dict[str, Any]:
+    """
+    Get the compact authorization claims to embed in a user's access token.
+    
+    Args:
+        user: The user the token is issued for.
+    
+    Returns:
+        Dictionary of claims.
+    """
+    return {
+        "cv": CLAIMS_VERSION,
+        "role": user.role.value,
+        "act": user.is_active,
+        "vfd": user.is_verified,
+        "tv": user.token_version,
+    }
@@ -0,0 +1,89 @@
+"""
+In-process cache of authenticated principals.
+
+Avoids a users table SELECT on every authenticated request by keeping a
+snapshot of the user's columns keyed by user ID and token issue time.
+"""
+
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.user import User
+
+settings = get_settings()
+
+
+class PrincipalCache:
+    """Bounded LRU/TTL cache of user column snapshots."""
+    
+    def __init__(self, max_size: int, ttl_seconds: float, token_lifetime_seconds: float):
+        self._cache: TTLCache[dict[str, Any]] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        # Token versions bumped in this process, kept while older tokens can still be valid
+        self._token_versions: TTLCache[int] = TTLCache(max_size=max_size, ttl_seconds=token_lifetime_seconds)
+    
+    async def get(self, db: AsyncSession, user_id: UUID, issued_at: Optional[int]) -> Optional[User]:
+        """
+        Get a cached user attached to the given session.
+        
+        The snapshot is merged without loading, so no query is emitted.
+        
+        Args:
+            db: Database session to attach the user to.
+            user_id: The user's ID.
+            issued_at: The token's ``iat`` claim.
+        
+        Returns:
+            The User object if cached, None otherwise.
+        """
+        snapshot = self._cache.get((user_id, issued_at))
+        if snapshot is None:
+            return None
+        
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    
+    def set(self, user_id: UUID, issued_at: Optional[int], user: User) -> None:
+        """Cache a snapshot of a loaded user's columns."""
+        snapshot = {
+            attr.key: getattr(user, attr.key)
+            for attr in User.__mapper__.column_attrs
+        }
+        self._cache.set((user_id, issued_at), snapshot)
+    
+    def invalidate(self, user_id: UUID) -> None:
+        """Drop every cached entry for a user."""
+        self._cache.delete_matching(lambda key: key[0] == user_id)
+    
+    def set_min_token_version(self, user_id: UUID, token_version: int) -> None:
+        """Reject claims from tokens issued before a token version bump."""
+        # Bumps can arrive out of order from the revocation sync; never lower the floor
+        if token_version > self._token_versions.get(user_id, 0):
+            self._token_versions.set(user_id, token_version)
+    
+    def min_token_version(self, user_id: UUID) -> int:
+        """Get the lowest token version known to be current for a user."""
+        return self._token_versions.get(user_id, 0)
+    
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._cache.clear()
+        self._token_versions.clear()
+    
+    def stats(self) -> dict[str, Any]:
+        """Get cache counters."""
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    token_lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+register_stats("principal_cache", principal_cache.stats)
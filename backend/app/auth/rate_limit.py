@@ -0,0 +1,181 @@
+"""
+Admission control for credential endpoints.
+
+Login and registration each cost a bcrypt hash, so they are rate limited
+per client IP and per email, and the number in flight per worker is capped.
+All checks are in-memory and run before any database or hashing work, so
+rejected traffic costs microseconds.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Hashable, Optional
+
+from fastapi import Request
+
+from app.config import get_settings
+from app.exceptions import TooManyRequestsException
+from app.metrics import register_stats
+
+settings = get_settings()
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding window rate limiter with a bounded number of keys.
+    
+    Uses the sliding window counter approximation: the previous fixed
+    window's count is weighted by how much of it still overlaps the sliding
+    window. Each key costs two counters regardless of its request rate.
+    Least recently seen keys are dropped once ``max_keys`` is reached.
+    Not thread-safe; call it from the event loop only.
+    """
+    
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 100000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        # key -> [window index, previous window count, current window count]
+        self._windows: OrderedDict[Hashable, list[int]] = OrderedDict()
+    
+    def hit(self, key: Hashable, now: Optional[float] = None) -> int:
+        """
+        Record a request for a key if it is within the limit.
+        
+        Args:
+            key: The rate limit key.
+            now: Current monotonic time, for testing.
+        
+        Returns:
+            0 if the request is allowed, otherwise seconds until it would be.
+        """
+        now = time.monotonic() if now is None else now
+        index, offset = divmod(now, self.window_seconds)
+        index = int(index)
+        
+        entry = self._windows.get(key)
+        if entry is None:
+            entry = [index, 0, 0]
+            self._windows[key] = entry
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+            if entry[0] != index:
+                entry[1] = entry[2] if entry[0] == index - 1 else 0
+                entry[2] = 0
+                entry[0] = index
+        
+        _, previous, current = entry
+        remaining = self.window_seconds - offset
+        estimate = previous * remaining / self.window_seconds + current
+        if estimate < self.limit:
+            entry[2] += 1
+            return 0
+        
+        if current >= self.limit or previous == 0:
+            return max(1, math.ceil(remaining))
+        # Time until the previous window's weight decays below the limit
+        wait = (estimate - self.limit) * self.window_seconds / previous
+        return max(1, math.ceil(min(wait, remaining)))
+    
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class LoginAdmission:
+    """Rate limits and a concurrency cap for credential checks."""
+    
+    def __init__(
+        self,
+        window_seconds: float,
+        per_ip: int,
+        per_email: int,
+        max_keys: int,
+        max_concurrent: int,
+    ):
+        self.by_ip = SlidingWindowLimiter(per_ip, window_seconds, max_keys)
+        self.by_email = SlidingWindowLimiter(per_email, window_seconds, max_keys)
+        self.max_concurrent = max_concurrent
+        self._in_flight = 0
+        self.admitted = 0
+        self.rejected_ip = 0
+        self.rejected_email = 0
+        self.rejected_concurrency = 0
+    
+    def _check(self, client_ip: Optional[str], email: str) -> None:
+        if client_ip is not None:
+            retry_after = self.by_ip.hit(client_ip)
+            if retry_after:
+                self.rejected_ip += 1
+                raise TooManyRequestsException(
+                    "Too many attempts from this address, please retry later",
+                    retry_after=retry_after,
+                )
+        
+        retry_after = self.by_email.hit(email.strip().lower())
+        if retry_after:
+            self.rejected_email += 1
+            raise TooManyRequestsException(
+                "Too many attempts for this account, please retry later",
+                retry_after=retry_after,
+            )
+        
+        if self._in_flight >= self.max_concurrent:
+            self.rejected_concurrency += 1
+            raise TooManyRequestsException("Too many authentication requests, please retry")
+    
+    @asynccontextmanager
+    async def admit(self, client_ip: Optional[str], email: str) -> AsyncIterator[None]:
+        """
+        Admit a credential check or reject it before any work is done.
+        
+        Args:
+            client_ip: The caller's address, if known.
+            email: The email address being authenticated or registered.
+        
+        Raises:
+            TooManyRequestsException: If a rate limit or the concurrency cap is hit.
+        """
+        self._check(client_ip, email)
+        self._in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+    
+    def stats(self) -> dict[str, Any]:
+        """Get admission counters."""
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrent": self.max_concurrent,
+            "tracked_ips": len(self.by_ip),
+            "tracked_emails": len(self.by_email),
+            "admitted": self.admitted,
+            "rejected_ip": self.rejected_ip,
+            "rejected_email": self.rejected_email,
+            "rejected_concurrency": self.rejected_concurrency,
+        }
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Get the caller's IP address.
+    
+    Behind a reverse proxy, run uvicorn with ``--proxy-headers`` so this is
+    the forwarded client address rather than the proxy's.
+    """
+    return request.client.host if request.client else None
+
+
+login_admission = LoginAdmission(
+    window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    per_ip=settings.LOGIN_RATE_LIMIT_PER_IP,
+    per_email=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+    max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+    max_concurrent=settings.LOGIN_MAX_CONCURRENT,
+)
+register_stats("login_admission", login_admission.stats)
@@ -0,0 +1,247 @@
+"""
+Token revocation store.
+
+Revoked token IDs (``jti``) are persisted to the ``revoked_tokens`` table
+and mirrored in memory, so checking a token on each request is a Bloom
+filter probe plus, on a hit, a dictionary lookup — no database round trip.
+Entries are dropped once the token would have expired anyway.
+
+Token version bumps (deactivation, deletion, password change) are kept in
+the ``revoked_token_versions`` table and synced the same way, so every
+process rejects a user's older access tokens, not only the one that
+made the change.
+"""
+
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.principal_cache import principal_cache
+from app.background import db_session, register_periodic_task
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.revoked_token import RevokedToken, RevokedTokenVersion
+
+settings = get_settings()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+    
+    def add(self, item: str) -> None:
+        """Add an item to the filter."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationStore:
+    """In-memory view of revoked tokens backed by the revoked_tokens table."""
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._expires_at: dict[str, datetime] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._synced_at: Optional[datetime] = None
+        self.checks = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+    
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Check whether a token ID has been revoked."""
+        if not jti:
+            return False
+        
+        self.checks += 1
+        if jti not in self._bloom:
+            return False
+        
+        self.bloom_positives += 1
+        if jti in self._expires_at:
+            return True
+        
+        self.false_positives += 1
+        return False
+    
+    def _add(self, jti: str, expires_at: datetime) -> None:
+        self._expires_at[jti] = expires_at
+        if len(self._expires_at) > self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+    
+    def _rebuild(self) -> None:
+        """Rebuild the Bloom filter from the exact set."""
+        capacity = max(self.capacity, len(self._expires_at) * 2)
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._expires_at:
+            bloom.add(jti)
+        self._bloom = bloom
+    
+    def _compact(self, now: datetime) -> None:
+        """Drop entries whose tokens have expired."""
+        expired = [jti for jti, expires_at in self._expires_at.items() if expires_at <= now]
+        if not expired:
+            return
+        for jti in expired:
+            del self._expires_at[jti]
+        self._rebuild()
+    
+    async def revoke(
+        self,
+        db: AsyncSession,
+        jti: str,
+        expires_at: datetime,
+        user_id: Optional[UUID] = None,
+    ) -> None:
+        """
+        Revoke a token until its expiry.
+        
+        Args:
+            db: Database session.
+            jti: The token's ID claim.
+            expires_at: When the token expires.
+            user_id: The token's subject.
+        """
+        await db.execute(
+            insert(RevokedToken)
+            .values(jti=jti, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        await db.commit()
+        self._add(jti, expires_at)
+    
+    async def revoke_token_version(self, db: AsyncSession, user_id: UUID, token_version: int) -> None:
+        """
+        Record a token version bump for other processes to pick up.
+        
+        Runs in the caller's transaction, so the bump is published only if
+        the change that caused it commits. The caller applies it to this
+        process with ``principal_cache.set_min_token_version`` after committing.
+        
+        Args:
+            db: Database session.
+            user_id: The user whose tokens are revoked.
+            token_version: The user's new token version.
+        """
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        statement = insert(RevokedTokenVersion).values(
+            user_id=user_id,
+            token_version=token_version,
+            expires_at=expires_at,
+        )
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[RevokedTokenVersion.user_id],
+                set_={
+                    "token_version": func.greatest(
+                        RevokedTokenVersion.token_version, statement.excluded.token_version
+                    ),
+                    "expires_at": statement.excluded.expires_at,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+    
+    async def _load_token_versions(self, db: AsyncSession, now: datetime, since: Optional[datetime]) -> None:
+        """Apply token version bumps, all of them or those made since ``since``."""
+        query = select(RevokedTokenVersion.user_id, RevokedTokenVersion.token_version).where(
+            RevokedTokenVersion.expires_at > now
+        )
+        if since is not None:
+            query = query.where(RevokedTokenVersion.updated_at >= since)
+        result = await db.execute(query)
+        for user_id, token_version in result.all():
+            principal_cache.set_min_token_version(user_id, token_version)
+    
+    async def load(self, db: AsyncSession) -> None:
+        """Load all unexpired revocations, e.g. at startup."""
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > now)
+        )
+        self._expires_at = {jti: expires_at for jti, expires_at in result.all()}
+        self._rebuild()
+        await self._load_token_versions(db, now, since=None)
+        self._synced_at = now
+    
+    async def sync(self, db: AsyncSession) -> None:
+        """
+        Pick up revocations made by other processes and purge expired ones.
+        
+        Token version bumps are applied to the principal cache. Expired
+        rows are deleted from the tables and from memory.
+        """
+        if self._synced_at is None:
+            await self.load(db)
+            return
+        
+        now = datetime.now(timezone.utc)
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        await db.execute(delete(RevokedTokenVersion).where(RevokedTokenVersion.expires_at <= now))
+        await db.commit()
+        
+        # Overlap the window to tolerate clock skew between processes
+        since = self._synced_at - timedelta(seconds=settings.REVOCATION_SYNC_SECONDS)
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.created_at >= since, RevokedToken.expires_at > now)
+        )
+        for jti, expires_at in result.all():
+            if jti not in self._expires_at:
+                self._add(jti, expires_at)
+        await self._load_token_versions(db, now, since=since)
+        
+        self._compact(now)
+        self._synced_at = now
+    
+    def stats(self) -> dict[str, Any]:
+        """Get store counters."""
+        return {
+            "revoked": len(self._expires_at),
+            "bloom_bits": self._bloom.num_bits,
+            "bloom_hashes": self._bloom.num_hashes,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_store = RevocationStore(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+)
+register_stats("token_revocation", revocation_store.stats)
+
+
+async def _sync_revocations() -> None:
+    async with db_session() as db:
+        await revocation_store.sync(db)
+
+
+register_periodic_task("token-revocation-sync", settings.REVOCATION_SYNC_SECONDS, _sync_revocations)
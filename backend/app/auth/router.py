@@ -2,12 +2,22 @@
 Authentication router for user registration, login, and token management.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user
-from app.auth.jwt_handler import create_token_pair, verify_refresh_token
+from app.auth.dependencies import get_current_principal, get_current_user, security
+from app.auth.jwt_handler import create_token_pair, decode_token, verify_refresh_token
+from app.auth.keys import get_token_keys
+from app.auth.revocation import revocation_store
 from app.auth.password import validate_password_strength
+from app.auth.principal import Principal, principal_claims
+from app.auth.principal_cache import principal_cache
+from app.auth.rate_limit import client_ip, login_admission
 from app.database import get_async_db
 from app.models.user import User
 from app.schemas.user import (
@@ -33,6 +43,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 )
 async def register(
     user_data: UserCreate,
+    request: Request,
     db: AsyncSession = Depends(get_async_db)
 ) -> UserResponse:
     """
@@ -44,16 +55,6 @@ async def register(
     - **last_name**: User's last name
     - **phone_number**: Optional phone number
     """
-    user_service = UserService(db)
-    
-    # Check if email already exists
-    existing_user = await user_service.get_by_email(user_data.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Validate password strength
     is_valid, error_message = validate_password_strength(user_data.password)
     if not is_valid:
@@ -62,11 +63,15 @@ async def register(
             detail=error_message
         )
     
-    # Create user
-    user = await user_service.create(user_data)
+    # Create the user and their credits; the unique email constraint rejects duplicates
+    async with login_admission.admit(client_ip(request), user_data.email):
+        user = await UserService(db).register(user_data)
     
-    # Initialize credits for the user
-    await user_service.initialize_credits(user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return UserResponse.model_validate(user)
 
@@ -79,6 +84,7 @@ async def register(
 )
 async def login(
     credentials: UserLogin,
+    request: Request,
     db: AsyncSession = Depends(get_async_db)
 ) -> Token:
     """
@@ -92,7 +98,8 @@ async def login(
     user_service = UserService(db)
     
     # Authenticate user
-    user = await user_service.authenticate(credentials.email, credentials.password)
+    async with login_admission.admit(client_ip(request), credentials.email):
+        user = await user_service.authenticate(credentials.email, credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -110,7 +117,7 @@ async def login(
     await user_service.update_last_login(user.id)
     
     # Create tokens
-    tokens = create_token_pair(user.id)
+    tokens = create_token_pair(user.id, claims=principal_claims(user))
     
     return Token(**tokens)
 
@@ -121,22 +128,48 @@ async def login(
     summary="Refresh access token",
     description="Get a new access token using a refresh token."
 )
-async def refresh_token(refresh_token: str) -> Token:
+async def refresh_token(
+    refresh_token: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> Token:
     """
     Refresh access token using a valid refresh token.
     
     - **refresh_token**: Valid refresh token from login
     """
-    user_id = verify_refresh_token(refresh_token)
-    if user_id is None:
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    payload = verify_refresh_token(refresh_token)
+    if payload is None:
+        raise invalid_token_exception
+    
+    # Reload the user so the new access token carries current claims
+    try:
+        user = await UserService(db).get_by_id(UUID(payload.get("sub")))
+    except (TypeError, ValueError):
+        raise invalid_token_exception
+    
+    if user is None:
+        raise invalid_token_exception
+    
+    # Refresh tokens issued before a token version bump (password change,
+    # deactivation, deletion) must not mint new access tokens
+    token_version = payload.get("tv", 0)
+    if token_version < max(user.token_version, principal_cache.min_token_version(user.id)):
+        raise invalid_token_exception
+    
+    if not user.is_active:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
         )
     
     # Create new token pair
-    tokens = create_token_pair(user_id)
+    tokens = create_token_pair(user.id, claims=principal_claims(user))
     
     return Token(**tokens)
 
@@ -145,20 +178,38 @@ async def refresh_token(refresh_token: str) -> Token:
     "/logout",
     status_code=status.HTTP_200_OK,
     summary="User logout",
-    description="Logout the current user (client should discard tokens)."
+    description="Logout the current user and revoke their tokens."
 )
 async def logout(
-    current_user: User = Depends(get_current_user),
+    refresh_token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     """
     Logout the current user.
     
-    Note: Tokens should be discarded on the client side.
-    This endpoint can be extended to implement token blacklisting.
+    - **refresh_token**: Optional refresh token to revoke as well
+    
+    The access token (and refresh token, if given) are revoked until they expire.
     """
-    # In a more advanced implementation, we could add the token to a blacklist
-    # For now, we just acknowledge the logout
+    tokens = [credentials.credentials]
+    if refresh_token:
+        tokens.append(refresh_token)
+    
+    for token in tokens:
+        payload = decode_token(token)
+        # Only revoke the caller's own tokens; tokens without a jti predate revocation
+        if payload is None or payload.get("sub") != str(principal.id) or not payload.get("jti"):
+            continue
+        
+        await revocation_store.revoke(
+            db,
+            jti=payload["jti"],
+            expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            user_id=principal.id,
+        )
+    
     return {"message": "Successfully logged out"}
 
 
@@ -170,7 +221,7 @@ async def logout(
 )
 async def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     """
@@ -183,7 +234,7 @@ async def change_password(
     user_service = UserService(db)
     
     # Verify current password
-    if not await user_service.verify_password(current_user.id, password_data.current_password):
+    if not await user_service.verify_password(principal.id, password_data.current_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
@@ -198,7 +249,7 @@ async def change_password(
         )
     
     # Update password
-    await user_service.update_password(current_user.id, password_data.new_password)
+    await user_service.update_password(principal.id, password_data.new_password)
     
     return {"message": "Password changed successfully"}
 
@@ -287,3 +338,18 @@ async def get_me(
     Returns the profile of the currently authenticated user.
     """
     return UserResponse.model_validate(current_user)
+
+
+@router.get(
+    "/.well-known/jwks.json",
+    summary="JSON Web Key Set",
+    description="Public keys for verifying access tokens locally."
+)
+async def get_jwks(response: Response) -> dict:
+    """
+    Get the public keys used to sign access tokens.
+    
+    Empty when tokens are signed with a shared secret.
+    """
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return get_token_keys().jwks()
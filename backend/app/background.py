@@ -0,0 +1,118 @@
+"""
+Background task runner for Saphire AI.
+
+Periodic jobs register here at import time and are started and stopped by
+the application lifespan.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db, primary_database
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """Open a database session outside of a request."""
+    sessions = get_async_db()
+    session = await sessions.__anext__()
+    try:
+        yield session
+    finally:
+        await sessions.aclose()
+
+
+@asynccontextmanager
+async def advisory_lock(key: int) -> AsyncIterator[bool]:
+    """
+    Try to take a session-level PostgreSQL advisory lock for the block.
+    
+    The lock belongs to the database connection that took it, so one
+    connection is held for the whole block and the unlock runs on it too.
+    If the process dies, the server drops the lock with the connection.
+    
+    Yields:
+        True if the lock was acquired, False if another session holds it.
+    """
+    async with primary_database.engine.connect() as connection:
+        locked = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})
+        await connection.commit()
+        try:
+            yield bool(locked)
+        finally:
+            if locked:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                await connection.commit()
+
+
+class PeriodicTask:
+    """Run a coroutine function on a fixed interval."""
+    
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
+    
+    def start(self) -> None:
+        """Start the task loop."""
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+    
+    async def stop(self) -> None:
+        """Cancel the task loop and wait for it to exit."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+_periodic_tasks: list[PeriodicTask] = []
+
+
+def register_periodic_task(
+    name: str,
+    interval_seconds: float,
+    func: Callable[[], Awaitable[None]],
+) -> PeriodicTask:
+    """
+    Register a coroutine function to run periodically while the app is up.
+    
+    An interval of 0 or less disables the task.
+    """
+    task = PeriodicTask(name, interval_seconds, func)
+    _periodic_tasks.append(task)
+    return task
+
+
+def start_periodic_tasks() -> None:
+    """Start all registered periodic tasks."""
+    for task in _periodic_tasks:
+        task.start()
+
+
+async def stop_periodic_tasks() -> None:
+    """Stop all registered periodic tasks."""
+    for task in reversed(_periodic_tasks):
+        await task.stop()
@@ -20,9 +20,98 @@ class Settings(BaseSettings):
     
     # Security
     SECRET_KEY: str
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # HS256, or RS256 with JWT_PRIVATE_KEY_FILE
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None
+    JWT_KEY_ID: str = "default"
+    JWT_PUBLIC_KEY_FILES: str = ""  # Retired keys still accepted: "kid=path,kid=path"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    METRICS_TOKEN: Optional[str] = None  # Bearer token for metrics scrapers; admins can always read /metrics
+    
+    # Database (asyncpg); pool sizes are per worker process
+    DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 10.0
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_CACHE_SIZE: int = 500  # 0 behind PgBouncer in transaction mode
+    DATABASE_COMMAND_TIMEOUT_SECONDS: float = 30.0
+    DATABASE_ECHO: bool = False
+    
+    # Optional read replica for read-only routes; reads fall back to the
+    # primary while it lags, and for a while after the reading user writes
+    DATABASE_READ_URL: Optional[str] = None
+    DATABASE_READ_POOL_SIZE: int = 10
+    DATABASE_READ_MAX_OVERFLOW: int = 10
+    DATABASE_READ_MAX_LAG_SECONDS: float = 5.0
+    DATABASE_READ_LAG_CHECK_SECONDS: float = 2.0
+    READ_YOUR_WRITES_SECONDS: float = 10.0
+    READ_YOUR_WRITES_MAX_USERS: int = 100000
+    
+    # Token revocation
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_SECONDS: int = 30
+    
+    # Login admission control (per worker process)
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    LOGIN_RATE_LIMIT_PER_IP: int = 30
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 5
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100000
+    LOGIN_MAX_CONCURRENT: int = 16
+    
+    # Last login write-behind buffer
+    LAST_LOGIN_FLUSH_SECONDS: float = 30.0
+    LAST_LOGIN_MAX_PENDING: int = 10000
+    
+    # Account deletion: larger accounts are deactivated and purged in batches
+    USER_DELETE_SYNC_MAX_ROWS: int = 2000
+    USER_PURGE_SECONDS: int = 60
+    USER_PURGE_BATCH_SIZE: int = 500
+    
+    # Ledger reconciliation (0 disables the scheduled run)
+    LEDGER_RECONCILIATION_SECONDS: int = 86400
+    LEDGER_RECONCILIATION_SHARDS: int = 4
+    LEDGER_RECONCILIATION_REPAIR: bool = False
+    
+    # Payment status: reuse a "pending" gateway answer, and SSE stream timing
+    PAYMENT_VERIFY_PENDING_CACHE_SECONDS: float = 10.0
+    PAYMENT_EVENTS_RECHECK_SECONDS: float = 15.0
+    PAYMENT_EVENTS_MAX_SECONDS: float = 300.0
+    
+    # Pending payment sweep via the Paystack transaction list (0 disables it)
+    PAYMENT_SWEEP_SECONDS: int = 900
+    PAYMENT_SWEEP_MIN_AGE_SECONDS: int = 600
+    PAYMENT_SWEEP_LOOKBACK_HOURS: int = 48
+    PAYMENT_SWEEP_PAGE_SIZE: int = 100
+    PAYMENT_SWEEP_CONCURRENCY: int = 4
+    
+    # Credit package catalog cache; max-age is what browsers and CDNs may reuse
+    PACKAGE_CATALOG_REVALIDATE_SECONDS: int = 60
+    PACKAGE_CATALOG_MAX_AGE_SECONDS: int = 60
+    
+    # Principal cache (authenticated user lookups)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Public profile cache; max-age is what browsers and CDNs may reuse
+    PROFILE_CACHE_SIZE: int = 10000
+    PROFILE_CACHE_TTL_SECONDS: int = 60
+    PROFILE_CACHE_MAX_AGE_SECONDS: int = 60
+    
+    # Password hashing pool (per worker process)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    
+    # bcrypt cost: fixed via BCRYPT_ROUNDS (see scripts/calibrate_bcrypt.py),
+    # or calibrated per worker at startup to BCRYPT_TARGET_MS per verify
+    # (0 keeps the passlib default). Calibrated costs only rehash stored
+    # hashes outside BCRYPT_MIN_ROUNDS..BCRYPT_MAX_ROUNDS.
+    BCRYPT_ROUNDS: Optional[int] = None
+    BCRYPT_TARGET_MS: int = 150
+    BCRYPT_MIN_ROUNDS: int = 10
+    BCRYPT_MAX_ROUNDS: int = 14
     
     # OpenAI
     OPENAI_API_KEY: str
@@ -38,6 +127,29 @@ class Settings(BaseSettings):
     PAYSTACK_SECRET_KEY: str
     PAYSTACK_BASE_URL: str = "https://api.paystack.co"
     
+    # Webhook inbox processing (per worker process)
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_POLL_SECONDS: float = 5.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BACKOFF_SECONDS: float = 30.0
+    WEBHOOK_LEASE_SECONDS: float = 300.0
+    
+    # Idempotency-Key handling for POST routes
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_PURGE_SECONDS: int = 3600
+    
+    # Outbound HTTP clients (one pool per provider, per worker process)
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_CLIENT_READ_TIMEOUT_SECONDS: float = 20.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CLIENT_MAX_RETRIES: int = 2
+    HTTP_CLIENT_RETRY_BACKOFF_SECONDS: float = 0.25
+    
     # Email (Resend)
     RESEND_API_KEY: str
     
@@ -1,16 +1,213 @@
 """
 Database module for Saphire AI Backend.
-Uses Supabase for database operations.
+
+Builds the async SQLAlchemy engine (asyncpg driver) and hands out one
+session per request. The engine is created by the application lifespan and
+disposed on shutdown; scripts that never run the lifespan get it created on
+first use. An optional read replica gets its own engine (see
+``app.read_routing``). Pool checkout waits and saturation are exposed
+through ``/metrics``. The Supabase clients are kept for storage and auth calls.
 """
 
-from typing import Any
+import time
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
 
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from supabase import Client, create_client
 
 from app.config import get_settings
+from app.metrics import register_stats
 
 settings = get_settings()
 
+
+class Base(DeclarativeBase):
+    """Declarative base for all models."""
+
+
+class PoolCheckoutStats:
+    """Counters for connection checkouts from one pool."""
+    
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_checked_out = 0
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how often and how long checkouts wait for a connection."""
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = PoolCheckoutStats()
+    
+    def recreate(self) -> "MeteredQueuePool":
+        # Keep counting across engine.dispose(), which swaps in a fresh pool
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+    
+    @property
+    def capacity(self) -> int:
+        """Most connections the pool will hand out at once."""
+        return self.size() + max(self._max_overflow, 0)
+    
+    def _do_get(self) -> Any:
+        stats = self.checkout_stats
+        # With every connection checked out, this checkout queues until one is returned
+        saturated = self._max_overflow >= 0 and self.checkedout() >= self.capacity
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            if saturated:
+                waited = time.perf_counter() - started
+                stats.waits += 1
+                stats.wait_seconds_total += waited
+                stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+        stats.checkouts += 1
+        stats.peak_checked_out = max(stats.peak_checked_out, self.checkedout())
+        return connection
+
+
+def _async_url(url: str) -> str:
+    """Point plain PostgreSQL URLs at the asyncpg driver."""
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+class Database:
+    """An async engine and its session factories."""
+    
+    def __init__(self, url: str, pool_size: int, max_overflow: int):
+        self.url = url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self._engine: Optional[AsyncEngine] = None
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._read_sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+    
+    def _create_engine(self) -> AsyncEngine:
+        return create_async_engine(
+            _async_url(self.url),
+            poolclass=MeteredQueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+            echo=settings.DATABASE_ECHO,
+            connect_args={
+                "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+                "command_timeout": settings.DATABASE_COMMAND_TIMEOUT_SECONDS,
+            },
+        )
+    
+    def start(self) -> None:
+        """Create the engine and session factory."""
+        if self._engine is None:
+            self._engine = self._create_engine()
+            self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+            # Transactions opened by read sessions are READ ONLY, so a stray write fails loudly
+            self._read_sessionmaker = async_sessionmaker(
+                self._engine.execution_options(postgresql_readonly=True),
+                expire_on_commit=False,
+            )
+    
+    @property
+    def engine(self) -> AsyncEngine:
+        """The engine, created if the database was not started."""
+        self.start()
+        return self._engine
+    
+    def session(self, read_only: bool = False) -> AsyncSession:
+        """Open a new session; use it as an async context manager."""
+        self.start()
+        return (self._read_sessionmaker if read_only else self._sessionmaker)()
+    
+    async def dispose(self) -> None:
+        """Close every pooled connection and drop the engine."""
+        engine, self._engine = self._engine, None
+        self._sessionmaker = self._read_sessionmaker = None
+        if engine is not None:
+            await engine.dispose()
+    
+    def stats(self) -> dict[str, Any]:
+        """Get pool occupancy and checkout counters."""
+        pool = self._engine.pool if self._engine is not None else None
+        if not isinstance(pool, MeteredQueuePool):
+            return {"started": False}
+        stats = pool.checkout_stats
+        checked_out = pool.checkedout()
+        return {
+            "started": True,
+            "pool_size": pool.size(),
+            "capacity": pool.capacity,
+            "checked_out": checked_out,
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(checked_out / pool.capacity, 3) if pool.capacity else 0.0,
+            "peak_checked_out": stats.peak_checked_out,
+            "checkouts": stats.checkouts,
+            "waits": stats.waits,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(stats.wait_seconds_max, 6),
+            "wait_seconds_avg": round(stats.wait_seconds_total / stats.waits, 6) if stats.waits else 0.0,
+        }
+
+
+primary_database = Database(
+    settings.DATABASE_URL,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+)
+register_stats("database", primary_database.stats)
+
+replica_database: Optional[Database] = None
+if settings.DATABASE_READ_URL:
+    replica_database = Database(
+        settings.DATABASE_READ_URL,
+        pool_size=settings.DATABASE_READ_POOL_SIZE,
+        max_overflow=settings.DATABASE_READ_MAX_OVERFLOW,
+    )
+    register_stats("database_replica", replica_database.stats)
+
+
+def track_user_writes(session: AsyncSession, user_id: UUID) -> None:
+    """
+    Attribute writes committed through ``session`` to a user.
+    
+    Read routing sends that user's reads to the primary for a short while
+    after each such commit, so they see their own writes despite replica lag.
+    """
+    session.info["user_id"] = user_id
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Provide a database session for one request.
+    
+    Closing the session at the end of the request rolls back anything left
+    uncommitted and returns its connection to the pool.
+    """
+    async with primary_database.session() as session:
+        yield session
+
+
 # Initialize Supabase client
 _supabase_client: Client | None = None
 
@@ -38,6 +235,9 @@ async def close_db() -> None:
     """Close database connections."""
     global _supabase_client
     _supabase_client = None
+    await primary_database.dispose()
+    if replica_database is not None:
+        await replica_database.dispose()
 
 
 # Type alias for database operations
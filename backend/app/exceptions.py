@@ -70,3 +70,19 @@ class AIProcessingException(SaphireException):
     
     def __init__(self, message: str = "AI processing failed"):
         super().__init__(message, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ServiceBusyException(SaphireException):
+    """Service temporarily overloaded exception."""
+    
+    def __init__(self, message: str = "Service busy, please retry", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class TooManyRequestsException(SaphireException):
+    """Rate limit exceeded exception."""
+    
+    def __init__(self, message: str = "Too many requests", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,164 @@
+"""
+Shared outbound HTTP clients for Saphire AI.
+
+Each upstream provider gets one long-lived ``httpx.AsyncClient`` with a
+keep-alive connection pool (HTTP/2 where the server supports it), explicit
+timeouts and bounded, jittered retries. Clients are registered at import
+time, opened by the application lifespan and closed on shutdown.
+"""
+
+import asyncio
+import random
+from typing import Any, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.metrics import register_stats
+
+settings = get_settings()
+
+# Methods that can be replayed without side effects
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Upstream responses worth retrying for idempotent requests
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class HTTPClientRegistry:
+    """Named, pooled HTTP clients with retry and counters."""
+    
+    def __init__(self):
+        self._configs: dict[str, dict[str, Any]] = {}
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+    
+    def register(
+        self,
+        name: str,
+        base_url: str = "",
+        headers: Optional[dict[str, str]] = None,
+        **client_kwargs: Any,
+    ) -> None:
+        """
+        Register a client to be created when the registry starts.
+        
+        Args:
+            name: Name used to look the client up.
+            base_url: Base URL for relative request paths.
+            headers: Default headers sent with every request.
+            **client_kwargs: Overrides for ``httpx.AsyncClient`` arguments.
+        """
+        self._configs[name] = {"base_url": base_url, "headers": headers or {}, **client_kwargs}
+        self._counters[name] = {"requests": 0, "retries": 0, "errors": 0}
+    
+    def _create(self, name: str) -> httpx.AsyncClient:
+        config = {
+            "http2": settings.HTTP_CLIENT_HTTP2,
+            "timeout": httpx.Timeout(
+                settings.HTTP_CLIENT_READ_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+            ),
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            **self._configs[name],
+        }
+        return httpx.AsyncClient(**config)
+    
+    async def start(self) -> None:
+        """Create every registered client."""
+        for name in self._configs:
+            if name not in self._clients:
+                self._clients[name] = self._create(name)
+    
+    def get(self, name: str) -> httpx.AsyncClient:
+        """
+        Get a registered client, creating it if the registry was not started.
+        
+        Raises:
+            KeyError: If no client was registered under ``name``.
+        """
+        client = self._clients.get(name)
+        if client is None:
+            client = self._clients[name] = self._create(name)
+        return client
+    
+    async def request(self, name: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request, retrying transient failures.
+        
+        Idempotent requests are retried on transport errors and on 429/502/503/504
+        responses. Other requests are only retried when the connection could not
+        be established, since the server never saw them.
+        
+        Args:
+            name: The registered client to use.
+            method: HTTP method.
+            url: URL or path relative to the client's base URL.
+            **kwargs: Passed to ``httpx.AsyncClient.request``.
+        
+        Returns:
+            The final response; status errors are left to the caller.
+        """
+        client = self.get(name)
+        counters = self._counters[name]
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        max_retries = settings.HTTP_CLIENT_MAX_RETRIES
+        
+        for attempt in range(max_retries + 1):
+            counters["requests"] += 1
+            retryable = attempt < max_retries
+            try:
+                response = await client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                counters["errors"] += 1
+                if not retryable:
+                    raise
+            except httpx.TransportError:
+                counters["errors"] += 1
+                if not (retryable and idempotent):
+                    raise
+            else:
+                if not (retryable and idempotent and response.status_code in RETRY_STATUS_CODES):
+                    return response
+                await response.aclose()
+            
+            counters["retries"] += 1
+            # Full jitter: spread retries so callers don't stampede a recovering upstream
+            backoff = settings.HTTP_CLIENT_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
+        
+        raise AssertionError("unreachable")
+    
+    async def aclose(self) -> None:
+        """Close every client and its connections."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+    
+    def _connection_counts(self, client: httpx.AsyncClient) -> dict[str, int]:
+        # httpx does not expose pool state publicly; read it from httpcore
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        return {
+            "connections": len(connections),
+            "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+        }
+    
+    def stats(self) -> dict[str, Any]:
+        """Get per-client counters and connection counts."""
+        stats = {}
+        for name, counters in self._counters.items():
+            client = self._clients.get(name)
+            stats[name] = {
+                **counters,
+                **(self._connection_counts(client) if client else {"connections": 0, "idle_connections": 0}),
+            }
+        return stats
+
+
+http_clients = HTTPClientRegistry()
+register_stats("http_clients", http_clients.stats)
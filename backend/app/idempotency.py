@@ -0,0 +1,250 @@
+"""
+Idempotency-Key support for POST routes.
+
+Routers opt in with ``route_class=IdempotentRoute``. A POST carrying an
+``Idempotency-Key`` header is run once per key and caller: the first
+request claims the key, and the response it produces is stored and
+replayed byte for byte to every retry. Duplicates arriving while the first
+is still running wait for it rather than running again. Requests without
+the header are untouched.
+"""
+
+import asyncio
+import hashlib
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.jwt_handler import verify_access_token_claims
+from app.background import db_session, register_periodic_task
+from app.config import get_settings
+from app.exceptions import BadRequestException, ConflictException
+from app.metrics import register_stats
+from app.models.idempotency_key import IdempotencyKey
+
+settings = get_settings()
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# How often a waiting duplicate re-reads the key, for claims held by other processes
+POLL_SECONDS = 0.1
+
+Handler = Callable[[Request], Coroutine[Any, Any, Response]]
+
+
+def _caller(request: Request) -> str:
+    """Identify the caller so keys are scoped per user."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        claims = verify_access_token_claims(token)
+        if claims and claims.get("sub"):
+            return f"user:{claims['sub']}"
+    return "anonymous"
+
+
+class IdempotencyStore:
+    """Claims keys, stores responses and replays them."""
+    
+    def __init__(self, ttl_seconds: float, lock_seconds: float, wait_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self._running: dict[tuple[str, str], asyncio.Event] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.mismatched = 0
+    
+    async def _claim(self, db: AsyncSession, scope: str, key: str, fingerprint: str) -> bool:
+        """Claim a key, taking over an expired or abandoned one. Returns True if claimed."""
+        stmt = insert(IdempotencyKey).values(
+            scope=scope,
+            key=key,
+            fingerprint=fingerprint,
+            locked_until=func.now() + timedelta(seconds=self.lock_seconds),
+            expires_at=func.now() + timedelta(seconds=self.ttl_seconds),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "status_code": None,
+                "content_type": None,
+                "response_body": None,
+                "locked_until": stmt.excluded.locked_until,
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": func.now(),
+            },
+            where=or_(
+                IdempotencyKey.expires_at < func.now(),
+                and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until < func.now()),
+            ),
+        ).returning(IdempotencyKey.key)
+        claimed = (await db.execute(stmt)).scalar_one_or_none() is not None
+        await db.commit()
+        return claimed
+    
+    async def _read(self, db: AsyncSession, scope: str, key: str) -> Optional[tuple]:
+        result = await db.execute(
+            select(
+                IdempotencyKey.fingerprint,
+                IdempotencyKey.status_code,
+                IdempotencyKey.content_type,
+                IdempotencyKey.response_body,
+            ).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        )
+        row = result.one_or_none()
+        await db.commit()
+        return row
+    
+    async def _finish(self, scope: str, key: str, response: Optional[Response]) -> None:
+        """Store the response, or release the key if there is nothing to replay."""
+        async with db_session() as db:
+            if response is None:
+                await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                )
+            else:
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                    .values(
+                        status_code=response.status_code,
+                        content_type=response.headers.get("content-type"),
+                        response_body=bytes(response.body),
+                        updated_at=func.now(),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+    
+    def _replay(self, row: tuple) -> Response:
+        _, status_code, content_type, body = row
+        self.replayed += 1
+        headers = {REPLAY_HEADER: "true"}
+        if content_type:
+            headers["content-type"] = content_type
+        return Response(content=body, status_code=status_code, headers=headers)
+    
+    async def _execute(self, scope: str, key: str, request: Request, handler: Handler) -> Response:
+        event = self._running[(scope, key)] = asyncio.Event()
+        response = None
+        try:
+            response = await handler(request)
+            self.executed += 1
+            return response
+        finally:
+            # Server errors and streamed bodies are not replayed; retries run again
+            replayable = response is not None and response.status_code < 500 and hasattr(response, "body")
+            try:
+                await asyncio.shield(self._finish(scope, key, response if replayable else None))
+            finally:
+                del self._running[(scope, key)]
+                event.set()
+    
+    async def run(self, scope: str, key: str, request: Request, handler: Handler) -> Response:
+        """
+        Run a request once per key, replaying the stored response to duplicates.
+        
+        Raises:
+            BadRequestException: If the key is invalid or was used for a different request.
+            ConflictException: If the first request is still running after the wait.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise BadRequestException(f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters")
+        
+        fingerprint = hashlib.sha256(await request.body()).hexdigest()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_seconds
+        waited = False
+        
+        while True:
+            async with db_session() as db:
+                claimed = await self._claim(db, scope, key, fingerprint)
+                row = None if claimed else await self._read(db, scope, key)
+            if claimed:
+                return await self._execute(scope, key, request, handler)
+            
+            if row is not None:
+                if row[0] != fingerprint:
+                    self.mismatched += 1
+                    raise BadRequestException(f"{IDEMPOTENCY_HEADER} was already used for a different request")
+                if row[1] is not None:
+                    return self._replay(row)
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise ConflictException(f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+            if not waited:
+                waited = True
+                self.waited += 1
+            
+            # A claim held in this process wakes us directly; otherwise poll
+            event = self._running.get((scope, key))
+            if event is None:
+                await asyncio.sleep(min(remaining, POLL_SECONDS))
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def purge_expired(self, db: AsyncSession) -> int:
+        """Delete expired keys. Returns the number deleted."""
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now()))
+        await db.commit()
+        return result.rowcount
+    
+    def stats(self) -> dict[str, Any]:
+        """Get idempotency counters."""
+        return {
+            "running": len(self._running),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "mismatched": self.mismatched,
+        }
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+)
+register_stats("idempotency", idempotency_store.stats)
+
+
+class IdempotentRoute(APIRoute):
+    """Route class honouring the Idempotency-Key header on POST requests."""
+    
+    def get_route_handler(self) -> Handler:
+        handler = super().get_route_handler()
+        
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if request.method != "POST" or not key:
+                return await handler(request)
+            scope = f"{request.method} {self.path_format} {_caller(request)}"
+            return await idempotency_store.run(scope, key, request, handler)
+        
+        return idempotent_handler
+
+
+async def _purge_expired_keys() -> None:
+    async with db_session() as db:
+        await idempotency_store.purge_expired(db)
+
+
+register_periodic_task(
+    "idempotency-key-purge",
+    settings.IDEMPOTENCY_PURGE_SECONDS,
+    _purge_expired_keys,
+)
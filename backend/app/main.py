@@ -1,18 +1,30 @@
 """
 Saphire AI - FastAPI Backend (Phase 2)
-Simplified backend using Supabase for database
+Simplified backend on PostgreSQL via async SQLAlchemy
 """
 
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import get_settings
+from app.auth.dependencies import require_metrics_access
+from app.auth.password import password_hashing_pool, tune_password_hashing
+from app.auth.revocation import revocation_store
 from app.auth.router import router as auth_router
+from app.background import db_session, start_periodic_tasks, stop_periodic_tasks
+from app.database import primary_database, replica_database
+from app.exceptions import SaphireException
+from app.http_clients import http_clients
+from app.metrics import collect_stats
+from app.read_routing import LAST_WRITE_HEADER, ReadYourWritesMiddleware, read_router
 from app.routes.credits import router as credits_router
 from app.routes.payments import router as payments_router
 from app.routes.users import router as users_router
+from app.services.last_login import last_login_buffer
+from app.services.webhook_service import webhook_processor
 
 settings = get_settings()
 
@@ -20,7 +32,25 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan context manager."""
+    primary_database.start()
+    if replica_database is not None:
+        replica_database.start()
+        await read_router.check_lag()
+    await tune_password_hashing()
+    async with db_session() as db:
+        await revocation_store.load(db)
+    await http_clients.start()
+    start_periodic_tasks()
+    webhook_processor.start()
     yield
+    await webhook_processor.stop()
+    await stop_periodic_tasks()
+    await last_login_buffer.flush()
+    await http_clients.aclose()
+    password_hashing_pool.shutdown()
+    await primary_database.dispose()
+    if replica_database is not None:
+        await replica_database.dispose()
 
 
 def create_application() -> FastAPI:
@@ -41,13 +71,28 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[LAST_WRITE_HEADER],
     )
+    app.add_middleware(ReadYourWritesMiddleware)
+    
+    @app.exception_handler(SaphireException)
+    async def saphire_exception_handler(request: Request, exc: SaphireException):
+        headers = None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            headers = {"Retry-After": str(retry_after)}
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.message},
+            headers=headers,
+        )
     
     # Include all routers
-    app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-    app.include_router(credits_router, prefix="/credits", tags=["Credits"])
-    app.include_router(payments_router, prefix="/payments", tags=["Payments"])
-    app.include_router(users_router, prefix="/users", tags=["Users"])
+    # Routers declare their own prefixes and tags
+    app.include_router(auth_router)
+    app.include_router(credits_router)
+    app.include_router(payments_router)
+    app.include_router(users_router)
     
     # Health check endpoint
     @app.get("/", tags=["Health"])
@@ -63,6 +108,15 @@ def create_application() -> FastAPI:
     async def health_check():
         return {"status": "healthy"}
     
+    @app.get(
+        "/metrics",
+        tags=["Health"],
+        include_in_schema=False,
+        dependencies=[Depends(require_metrics_access)],
+    )
+    async def metrics():
+        return collect_stats()
+    
     return app
 
 
@@ -0,0 +1,20 @@
+"""
+In-process runtime metrics for Saphire AI.
+
+Components register a stats provider and the ``/metrics`` endpoint
+collects a snapshot from each of them.
+"""
+
+from typing import Any, Callable
+
+_providers: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], dict[str, Any]]) -> None:
+    """Register a callable that returns a component's counters."""
+    _providers[name] = provider
+
+
+def collect_stats() -> dict[str, dict[str, Any]]:
+    """Collect counters from every registered component."""
+    return {name: provider() for name, provider in _providers.items()}
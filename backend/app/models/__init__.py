@@ -8,6 +8,9 @@ from app.models.interview import Interview, InterviewQuestion, InterviewAnswer,
 from app.models.presentation import Presentation, PresentationQuestion, PresentationAnswer, PresentationStatus, PresentationType, AudienceType
 from app.models.feedback import Feedback, FeedbackCategory, FeedbackItem
 from app.models.payment import Payment, CreditPackage, PaymentStatus, PaymentMethod
+from app.models.revoked_token import RevokedToken, RevokedTokenVersion
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.models.idempotency_key import IdempotencyKey
 
 __all__ = [
     # User
@@ -40,4 +43,11 @@ __all__ = [
     "CreditPackage",
     "PaymentStatus",
     "PaymentMethod",
+    "WebhookEvent",
+    "WebhookEventStatus",
+    # Auth
+    "RevokedToken",
+    "RevokedTokenVersion",
+    # Requests
+    "IdempotencyKey",
 ]
@@ -6,8 +6,8 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -41,9 +41,12 @@ class Credit(BaseModel):
     lifetime_earned = Column(Integer, default=0, nullable=False)
     lifetime_used = Column(Integer, default=0, nullable=False)
     
+    # Newest-first copies of the latest ledger entries, maintained with each write
+    recent_transactions = Column(JSONB, default=list, server_default=text("'[]'::jsonb"), nullable=False)
+    
     # Relationships
     user = relationship("User", back_populates="credits")
-    transactions = relationship("CreditTransaction", back_populates="credit", cascade="all, delete-orphan")
+    transactions = relationship("CreditTransaction", back_populates="credit", cascade="all, delete-orphan", passive_deletes=True)
     
     def add_credits(self, amount: int) -> None:
         """Add credits to balance."""
@@ -66,6 +69,10 @@ class CreditTransaction(BaseModel):
     """Credit transaction model for tracking all credit movements."""
     
     __tablename__ = "credit_transactions"
+    __table_args__ = (
+        # Keyset pagination of a user's history, newest first
+        Index("ix_credit_transactions_user_created", "user_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     credit_id = Column(UUID(as_uuid=True), ForeignKey("credits.id", ondelete="CASCADE"), nullable=False)
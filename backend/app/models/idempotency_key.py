@@ -0,0 +1,32 @@
+"""
+Idempotency key model for replaying responses to retried POST requests.
+"""
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+
+from app.models.base import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """A client-supplied Idempotency-Key and the response it produced."""
+    
+    __tablename__ = "idempotency_keys"
+    
+    # Method, route and caller, so keys never collide across users or endpoints
+    scope = Column(String(255), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    
+    # SHA-256 of the request body; a reused key must carry the same request
+    fingerprint = Column(String(64), nullable=False)
+    
+    # Stored response; status_code is NULL while the first request is running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    
+    # An unfinished claim past this time was abandoned and can be taken over
+    locked_until = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey(scope={self.scope}, key={self.key}, status={self.status_code})>"
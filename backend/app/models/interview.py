@@ -59,8 +59,8 @@ class Interview(BaseModel):
     
     # Relationships
     user = relationship("User", back_populates="interviews")
-    questions = relationship("InterviewQuestion", back_populates="interview", cascade="all, delete-orphan", order_by="InterviewQuestion.question_number")
-    feedback = relationship("Feedback", back_populates="interview", uselist=False, cascade="all, delete-orphan")
+    questions = relationship("InterviewQuestion", back_populates="interview", cascade="all, delete-orphan", passive_deletes=True, order_by="InterviewQuestion.question_number")
+    feedback = relationship("Feedback", back_populates="interview", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
     
     @property
     def total_questions(self) -> int:
@@ -97,7 +97,7 @@ class InterviewQuestion(BaseModel):
     
     # Relationships
     interview = relationship("Interview", back_populates="questions")
-    answers = relationship("InterviewAnswer", back_populates="question", cascade="all, delete-orphan")
+    answers = relationship("InterviewAnswer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self) -> str:
         return f"<InterviewQuestion(id={self.id}, number={self.question_number})>"
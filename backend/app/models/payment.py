@@ -6,7 +6,7 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, Numeric, String, Text, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
@@ -37,6 +37,17 @@ class Payment(BaseModel):
     """Payment transaction model."""
     
     __tablename__ = "payments"
+    __table_args__ = (
+        # Keyset pagination of a user's history, newest first
+        Index("ix_payments_user_created", "user_id", "created_at", "id"),
+        # Index-only scans for a user's purchase totals
+        Index(
+            "ix_payments_user_success_totals",
+            "user_id",
+            postgresql_include=["amount_kobo", "credits_purchased"],
+            postgresql_where=text("status = 'SUCCESS'"),
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
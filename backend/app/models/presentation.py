@@ -77,8 +77,8 @@ class Presentation(BaseModel):
     
     # Relationships
     user = relationship("User", back_populates="presentations")
-    questions = relationship("PresentationQuestion", back_populates="presentation", cascade="all, delete-orphan", order_by="PresentationQuestion.question_number")
-    feedback = relationship("Feedback", back_populates="presentation", uselist=False, cascade="all, delete-orphan")
+    questions = relationship("PresentationQuestion", back_populates="presentation", cascade="all, delete-orphan", passive_deletes=True, order_by="PresentationQuestion.question_number")
+    feedback = relationship("Feedback", back_populates="presentation", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
     
     @property
     def total_questions(self) -> int:
@@ -115,7 +115,7 @@ class PresentationQuestion(BaseModel):
     
     # Relationships
     presentation = relationship("Presentation", back_populates="questions")
-    answers = relationship("PresentationAnswer", back_populates="question", cascade="all, delete-orphan")
+    answers = relationship("PresentationAnswer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self) -> str:
         return f"<PresentationQuestion(id={self.id}, number={self.question_number})>"
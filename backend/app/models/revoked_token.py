@@ -0,0 +1,39 @@
+"""
+Revoked token models for access and refresh token revocation.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+from app.models.base import BaseModel
+
+
+class RevokedToken(BaseModel):
+    """A revoked JWT, kept until the token would have expired anyway."""
+    
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<RevokedToken(jti={self.jti}, expires_at={self.expires_at})>"
+
+
+class RevokedTokenVersion(BaseModel):
+    """
+    A user's token version bump, kept while older access tokens can still be valid.
+    
+    Has no foreign key to users so the bump outlives a deleted account.
+    """
+    
+    __tablename__ = "revoked_token_versions"
+    
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    token_version = Column(Integer, nullable=False)  # Tokens with a lower version are rejected
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<RevokedTokenVersion(user_id={self.user_id}, token_version={self.token_version})>"
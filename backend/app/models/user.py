@@ -6,7 +6,7 @@ import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Enum, Index, Integer, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -24,6 +24,10 @@ class User(BaseModel):
     """User model for authentication and user management."""
     
     __tablename__ = "users"
+    __table_args__ = (
+        # Lets the purge job find accounts awaiting deletion
+        Index("ix_users_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -43,16 +47,18 @@ class User(BaseModel):
     is_active = Column(Boolean, default=True, nullable=False)
     is_verified = Column(Boolean, default=False, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped to invalidate token claims
     
     # Timestamps
     last_login = Column(DateTime(timezone=True), nullable=True)
     email_verified_at = Column(DateTime(timezone=True), nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)  # Set when deletion is left to the purge job
     
     # Relationships
-    credits = relationship("Credit", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    interviews = relationship("Interview", back_populates="user", cascade="all, delete-orphan")
-    presentations = relationship("Presentation", back_populates="user", cascade="all, delete-orphan")
-    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
+    credits = relationship("Credit", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    interviews = relationship("Interview", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    presentations = relationship("Presentation", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     
     @property
     def full_name(self) -> str:
@@ -0,0 +1,47 @@
+"""
+Webhook event model for the inbound webhook inbox.
+"""
+
+import uuid
+from enum import Enum as PyEnum
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.models.base import BaseModel
+
+
+class WebhookEventStatus(str, PyEnum):
+    """Webhook event processing status enumeration."""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    FAILED = "failed"
+
+
+class WebhookEvent(BaseModel):
+    """A verified webhook delivery waiting for, or done with, processing."""
+    
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # Workers poll for due events
+        Index("ix_webhook_events_due", "status", "next_attempt_at"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    provider = Column(String(32), nullable=False)
+    event_key = Column(String(255), unique=True, nullable=False)  # Deduplicates redeliveries
+    event_type = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    
+    # Processing state
+    status = Column(Enum(WebhookEventStatus), default=WebhookEventStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<WebhookEvent(key={self.event_key}, status={self.status}, attempts={self.attempts})>"
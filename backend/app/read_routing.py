@@ -0,0 +1,278 @@
+"""
+Read routing between the primary database and an optional read replica.
+
+Read-only routes take their session from ``get_read_db`` or
+``get_user_read_db`` instead of ``get_async_db``. The session is bound to
+the replica when ``DATABASE_READ_URL`` is set and to the primary otherwise;
+either way its transactions are READ ONLY. Reads go to the primary instead
+while the replica lags by more than ``DATABASE_READ_MAX_LAG_SECONDS`` or
+cannot be reached, and for ``READ_YOUR_WRITES_SECONDS`` after the user whose
+data is being read committed a write.
+
+Requests that commit a user's write get a signed ``X-Last-Write`` response
+header. Clients send it back on later reads, so any process can tell that
+the caller wrote recently. Writes this process committed are also
+remembered in memory, for clients that do not echo the header.
+"""
+
+import hashlib
+import hmac
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth.dependencies import get_current_principal
+from app.auth.principal import Principal
+from app.background import register_periodic_task
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import Database, primary_database, replica_database
+from app.metrics import register_stats
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Zero while the replica has replayed everything it received, so an idle
+# primary does not read as lag
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# Writes committed while handling the current request, by user ID
+_request_writes: ContextVar[Optional[dict[UUID, float]]] = ContextVar("request_writes", default=None)
+
+
+def _last_write_signature(user_id: UUID, written_at_ms: str) -> str:
+    message = f"{user_id}:{written_at_ms}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_last_write(user_id: UUID, written_at: float) -> str:
+    """Build the ``X-Last-Write`` value for a user's write at ``written_at``."""
+    written_at_ms = str(int(written_at * 1000))
+    return f"{written_at_ms}.{_last_write_signature(user_id, written_at_ms)}"
+
+
+def parse_last_write(value: Optional[str], user_id: UUID) -> Optional[float]:
+    """
+    Read an ``X-Last-Write`` value.
+    
+    Returns:
+        The write time, or None if the value is missing, malformed or was
+        not issued for ``user_id``.
+    """
+    if not value:
+        return None
+    written_at_ms, _, signature = value.partition(".")
+    if not written_at_ms.isdigit():
+        return None
+    if not hmac.compare_digest(signature, _last_write_signature(user_id, written_at_ms)):
+        return None
+    return int(written_at_ms) / 1000
+
+
+class ReadRouter:
+    """Chooses the database for each read and tracks recent writers."""
+    
+    def __init__(
+        self,
+        primary: Database,
+        replica: Optional[Database],
+        max_lag_seconds: float,
+        window_seconds: float,
+        max_users: int,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.window_seconds = window_seconds
+        self._recent_writers: TTLCache[bool] = TTLCache(max_size=max_users, ttl_seconds=window_seconds)
+        # Unknown until the first check, so reads start on the primary
+        self.lag_seconds: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.read_your_writes = 0
+        self.lag_fallbacks = 0
+    
+    def mark_write(self, user_id: UUID) -> None:
+        """Send a user's reads to the primary for the read-your-writes window."""
+        if self.replica is not None:
+            self._recent_writers.set(user_id, True)
+    
+    def route(self, user_id: Optional[UUID] = None, last_write: Optional[float] = None) -> Database:
+        """
+        Pick the database for a read.
+        
+        Args:
+            user_id: The user whose data is being read, if any.
+            last_write: When the user last wrote, as reported by the client.
+        """
+        if self.replica is None:
+            self.primary_reads += 1
+            return self.primary
+        recently_wrote = last_write is not None and time.time() - last_write < self.window_seconds
+        if user_id is not None and (recently_wrote or self._recent_writers.get(user_id)):
+            self.read_your_writes += 1
+            self.primary_reads += 1
+            return self.primary
+        if self.lag_seconds is None or self.lag_seconds > self.max_lag_seconds:
+            self.lag_fallbacks += 1
+            self.primary_reads += 1
+            return self.primary
+        self.replica_reads += 1
+        return self.replica
+    
+    async def check_lag(self) -> Optional[float]:
+        """
+        Measure replication lag; an unreachable replica counts as unknown.
+        
+        Returns:
+            Lag in seconds, or None if it could not be measured.
+        """
+        if self.replica is None:
+            return None
+        try:
+            async with self.replica.session(read_only=True) as db:
+                lag = (await db.execute(REPLICA_LAG_QUERY)).scalar()
+        except Exception as exc:
+            logger.warning("Replica lag check failed: %s", exc)
+            lag = None
+        self.lag_seconds = float(lag) if lag is not None else None
+        return self.lag_seconds
+    
+    def stats(self) -> dict[str, Any]:
+        """Get routing counters."""
+        return {
+            "replica_configured": self.replica is not None,
+            "lag_seconds": self.lag_seconds,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "read_your_writes": self.read_your_writes,
+            "lag_fallbacks": self.lag_fallbacks,
+            "recent_writers": len(self._recent_writers),
+        }
+
+
+read_router = ReadRouter(
+    primary=primary_database,
+    replica=replica_database,
+    max_lag_seconds=settings.DATABASE_READ_MAX_LAG_SECONDS,
+    window_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    max_users=settings.READ_YOUR_WRITES_MAX_USERS,
+)
+register_stats("read_routing", read_router.stats)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement_write(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush_write(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed_writes(session: Session) -> None:
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        read_router.mark_write(user_id)
+        writes = _request_writes.get()
+        if writes is not None:
+            writes[user_id] = time.time()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_writes(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+class ReadYourWritesMiddleware:
+    """Add ``X-Last-Write`` to responses of requests that committed a user's write."""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or read_router.replica is None:
+            await self.app(scope, receive, send)
+            return
+        
+        writes: dict[UUID, float] = {}
+        
+        async def send_with_last_write(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes:
+                headers = MutableHeaders(scope=message)
+                for user_id, written_at in writes.items():
+                    headers.append(LAST_WRITE_HEADER, sign_last_write(user_id, written_at))
+            await send(message)
+        
+        token = _request_writes.set(writes)
+        try:
+            await self.app(scope, receive, send_with_last_write)
+        finally:
+            _request_writes.reset(token)
+
+
+@asynccontextmanager
+async def read_session(
+    user_id: Optional[UUID] = None,
+    last_write: Optional[float] = None,
+) -> AsyncIterator[AsyncSession]:
+    """
+    Open a read-only session on the database chosen for ``user_id``'s data.
+    
+    Args:
+        user_id: The user whose data is being read, or None for shared data.
+        last_write: When the user last wrote, from ``parse_last_write``.
+    """
+    async with read_router.route(user_id, last_write).session(read_only=True) as session:
+        yield session
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """Provide a read-only session for a request reading shared data."""
+    async with read_session() as session:
+        yield session
+
+
+async def get_user_read_db(
+    request: Request,
+    principal: Principal = Depends(get_current_principal)
+) -> AsyncIterator[AsyncSession]:
+    """
+    Provide a read-only session for a request reading the caller's own data.
+    
+    Reads go to the primary while the request's ``X-Last-Write`` header
+    shows a write within the read-your-writes window.
+    """
+    last_write = parse_last_write(request.headers.get(LAST_WRITE_HEADER), principal.id)
+    async with read_session(principal.id, last_write) as session:
+        yield session
+
+
+register_periodic_task(
+    "replica-lag-check",
+    settings.DATABASE_READ_LAG_CHECK_SECONDS if replica_database is not None else 0,
+    read_router.check_lag,
+)
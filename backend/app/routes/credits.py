@@ -2,12 +2,16 @@
 Credit router for credit-related endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_principal
+from app.auth.principal import Principal
+from app.config import get_settings
 from app.database import get_async_db
-from app.models.user import User
+from app.read_routing import get_read_db, get_user_read_db
 from app.schemas.credit import (
     CreditBalance,
     CreditHistoryResponse,
@@ -16,7 +20,10 @@ from app.schemas.credit import (
     CreditTransactionResponse,
 )
 from app.services.credit_service import CreditService
-from app.services.payment_service import PaymentService
+from app.services.package_catalog import package_catalog
+from app.utils import etag_matches
+
+settings = get_settings()
 
 router = APIRouter(prefix="/credits", tags=["Credits"])
 
@@ -28,8 +35,8 @@ router = APIRouter(prefix="/credits", tags=["Credits"])
     description="Get the current credit balance for the authenticated user."
 )
 async def get_balance(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_user_read_db)
 ) -> CreditBalance:
     """
     Get current user's credit balance.
@@ -37,7 +44,10 @@ async def get_balance(
     Returns the current balance, lifetime earned, and lifetime used credits.
     """
     credit_service = CreditService(db)
-    credit = await credit_service.get_or_create_credit(current_user.id)
+    credit = await credit_service.get_credit(principal.id)
+    
+    if credit is None:
+        return CreditBalance(balance=0, lifetime_earned=0, lifetime_used=0)
     
     return CreditBalance(
         balance=credit.balance,
@@ -53,35 +63,26 @@ async def get_balance(
     description="Get all available credit packages for purchase."
 )
 async def get_credit_packages(
-    db: AsyncSession = Depends(get_async_db)
-) -> list[CreditPackageResponse]:
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+) -> Response:
     """
     Get all available credit packages.
     
     Returns a list of active credit packages sorted by display order.
+    Served from the in-memory package catalog with an ETag; a matching
+    ``If-None-Match`` gets 304 Not Modified.
     """
-    payment_service = PaymentService(db)
-    packages = await payment_service.get_all_credit_packages()
+    catalog = await package_catalog.get(db)
+    headers = {
+        "ETag": catalog.etag,
+        "Cache-Control": f"public, max-age={settings.PACKAGE_CATALOG_MAX_AGE_SECONDS}",
+    }
+    
+    if etag_matches(request.headers.get("if-none-match"), catalog.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return [
-        CreditPackageResponse(
-            id=pkg.id,
-            name=pkg.name,
-            slug=pkg.slug,
-            description=pkg.description,
-            price_kobo=pkg.price_kobo,
-            price_naira=pkg.price_naira,
-            currency=pkg.currency,
-            credits_amount=pkg.credits_amount,
-            bonus_credits=pkg.bonus_credits,
-            total_credits=pkg.total_credits,
-            features=pkg.features or [],
-            is_popular=pkg.is_popular == "Y",
-            is_active=pkg.is_active == "Y",
-            display_order=pkg.display_order,
-        )
-        for pkg in packages
-    ]
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
 
 @router.get(
@@ -92,21 +93,27 @@ async def get_credit_packages(
 )
 async def get_transaction_history(
     page: int = 1,
-    page_size: int = 20,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_user_read_db)
 ) -> CreditHistoryResponse:
     """
     Get credit transaction history.
     
     - **page**: Page number (default: 1)
     - **page_size**: Number of transactions per page (default: 20)
+    - **cursor**: ``next_cursor`` from the previous page; replaces ``page``
+    - **include_total**: Also return the total count (costs an extra query)
     """
     credit_service = CreditService(db)
-    transactions, total_count = await credit_service.get_transaction_history(
-        user_id=current_user.id,
+    transactions, next_cursor, total_count = await credit_service.get_transaction_history(
+        user_id=principal.id,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
     )
     
     return CreditHistoryResponse(
@@ -116,6 +123,7 @@ async def get_transaction_history(
         total_count=total_count,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -126,7 +134,7 @@ async def get_transaction_history(
     description="Get a summary of credits including balance and recent transactions."
 )
 async def get_credit_summary(
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> CreditSummary:
     """
@@ -137,13 +145,12 @@ async def get_credit_summary(
     - Available packages
     """
     credit_service = CreditService(db)
-    payment_service = PaymentService(db)
     
     # Get credit summary
-    summary = await credit_service.get_credit_summary(current_user.id)
+    summary = await credit_service.get_credit_summary(principal.id)
     
     # Get available packages
-    packages = await payment_service.get_all_credit_packages()
+    catalog = await package_catalog.get(db)
     
     return CreditSummary(
         current_balance=summary["current_balance"],
@@ -153,25 +160,7 @@ async def get_credit_summary(
             CreditTransactionResponse.model_validate(t)
             for t in summary["recent_transactions"]
         ],
-        available_packages=[
-            CreditPackageResponse(
-                id=pkg.id,
-                name=pkg.name,
-                slug=pkg.slug,
-                description=pkg.description,
-                price_kobo=pkg.price_kobo,
-                price_naira=pkg.price_naira,
-                currency=pkg.currency,
-                credits_amount=pkg.credits_amount,
-                bonus_credits=pkg.bonus_credits,
-                total_credits=pkg.total_credits,
-                features=pkg.features or [],
-                is_popular=pkg.is_popular == "Y",
-                is_active=pkg.is_active == "Y",
-                display_order=pkg.display_order,
-            )
-            for pkg in packages
-        ],
+        available_packages=list(catalog.packages),
     )
 
 
@@ -2,11 +2,18 @@
 Payment router for handling credit purchases.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_principal, get_current_user
+from app.auth.principal import Principal
 from app.database import get_async_db
+from app.idempotency import IdempotentRoute
+from app.read_routing import get_user_read_db
 from app.models.user import User
 from app.schemas.payment import (
     PaymentInitializeRequest,
@@ -14,13 +21,14 @@ from app.schemas.payment import (
     PaymentListResponse,
     PaymentResponse,
     PaymentVerifyResponse,
-    PaystackWebhookPayload,
     TransactionHistoryResponse,
 )
 from app.services.credit_service import CreditService
-from app.services.payment_service import PaymentService
+from app.services.payment_service import PaymentService, paystack_client, watch_payment_status
+from app.services.webhook_service import WebhookInboxService, webhook_event_key, webhook_processor
+from app.utils import sse_message
 
-router = APIRouter(prefix="/payments", tags=["Payments"])
+router = APIRouter(prefix="/payments", tags=["Payments"], route_class=IdempotentRoute)
 
 
 @router.post(
@@ -61,7 +69,7 @@ async def initialize_payment(
             access_code=result["access_code"],
             reference=result["reference"],
         )
-        
+    
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -82,7 +90,7 @@ async def initialize_payment(
 )
 async def verify_payment(
     reference: str,
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> PaymentVerifyResponse:
     """
@@ -99,7 +107,7 @@ async def verify_payment(
         success, payment = await payment_service.verify_payment(reference)
         
         if success:
-            balance = await credit_service.get_balance(current_user.id)
+            balance = await credit_service.get_balance(principal.id)
             return PaymentVerifyResponse(
                 success=True,
                 message="Payment successful",
@@ -113,9 +121,9 @@ async def verify_payment(
                 message="Payment verification failed or pending",
                 payment=PaymentResponse.model_validate(payment) if payment else None,
                 credits_added=0,
-                new_balance=await credit_service.get_balance(current_user.id),
+                new_balance=await credit_service.get_balance(principal.id),
             )
-            
+    
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -128,6 +136,43 @@ async def verify_payment(
         )
 
 
+@router.get(
+    "/{reference}/events",
+    summary="Stream payment status",
+    description="Server-Sent Events stream reporting when a payment succeeds or fails."
+)
+async def stream_payment_status(
+    reference: str,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+) -> StreamingResponse:
+    """
+    Stream a payment's status as Server-Sent Events.
+    
+    Sends a ``status`` event with the current status, then one per change,
+    and closes once the payment succeeds or fails. Use this instead of
+    polling the verify endpoint while a payment is pending.
+    
+    - **reference**: The payment reference from Paystack
+    """
+    payment = await PaymentService(db).get_payment_by_reference(reference, user_id=principal.id)
+    if not payment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment not found",
+        )
+    
+    async def events():
+        async for event in watch_payment_status(reference):
+            yield sse_message(event, event="status")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/history",
     response_model=PaymentListResponse,
@@ -136,21 +181,27 @@ async def verify_payment(
 )
 async def get_payment_history(
     page: int = 1,
-    page_size: int = 20,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_user_read_db)
 ) -> PaymentListResponse:
     """
     Get payment history.
     
     - **page**: Page number (default: 1)
     - **page_size**: Number of payments per page (default: 20)
+    - **cursor**: ``next_cursor`` from the previous page; replaces ``page``
+    - **include_total**: Also return the total count (costs an extra query)
     """
     payment_service = PaymentService(db)
-    payments, total_count = await payment_service.get_user_payments(
-        user_id=current_user.id,
+    payments, next_cursor, total_count = await payment_service.get_user_payments(
+        user_id=principal.id,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
     )
     
     return PaymentListResponse(
@@ -158,6 +209,7 @@ async def get_payment_history(
         total_count=total_count,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
@@ -175,53 +227,73 @@ async def paystack_webhook(
     Handle Paystack webhook events.
     
     This endpoint receives webhook events from Paystack for payment updates.
+    Verified events are stored in the webhook inbox and acknowledged at once;
+    background workers process them and retry failures.
     """
-    # In production, verify webhook signature
-    # signature = request.headers.get("x-paystack-signature")
+    body = await request.body()
+    if not paystack_client.verify_webhook_signature(body, request.headers.get("x-paystack-signature")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
     
     try:
-        payload = await request.json()
-        payment_service = PaymentService(db)
-        
-        success = await payment_service.handle_webhook(payload)
-        
-        if success:
-            return {"status": "success"}
-        else:
-            return {"status": "processed"}
-            
-    except Exception as e:
-        # Log the error but return 200 to prevent Paystack retries
-        # if the error is unrecoverable
-        return {"status": "error", "message": str(e)}
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+    if not isinstance(payload, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+    
+    event_key = webhook_event_key("paystack", payload, body)
+    created = await WebhookInboxService(db).enqueue("paystack", event_key, payload)
+    if created:
+        webhook_processor.notify()
+    
+    return {"status": "accepted" if created else "duplicate"}
 
 
 @router.get(
     "/transaction-summary",
     response_model=TransactionHistoryResponse,
     summary="Get transaction summary",
-    description="Get a summary of all payment transactions."
+    description="Get purchase totals over all payments, with an optional page of recent payments."
 )
 async def get_transaction_summary(
-    current_user: User = Depends(get_current_user),
+    payments_limit: int = Query(20, ge=0, le=100),
+    cursor: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> TransactionHistoryResponse:
     """
     Get transaction summary including total spent and credits purchased.
+    
+    Totals always cover the full history.
+    
+    - **payments_limit**: Number of recent payments to include (0 for totals only)
+    - **cursor**: ``next_cursor`` from a previous response, for more payments
     """
     payment_service = PaymentService(db)
-    payments, _ = await payment_service.get_user_payments(
-        user_id=current_user.id,
-        page=1,
-        page_size=1000,  # Get all
-    )
+    totals = await payment_service.get_payment_totals(principal.id)
     
-    # Calculate totals
-    total_spent = sum(p.amount_naira for p in payments if p.status.value == "success")
-    total_credits = sum(p.credits_purchased for p in payments if p.status.value == "success")
+    payments, next_cursor = [], None
+    if payments_limit:
+        payments, next_cursor, _ = await payment_service.get_user_payments(
+            user_id=principal.id,
+            page_size=payments_limit,
+            cursor=cursor,
+        )
     
     return TransactionHistoryResponse(
         payments=[PaymentResponse.model_validate(p) for p in payments],
-        total_spent_naira=total_spent,
-        total_credits_purchased=total_credits,
+        total_spent_naira=totals["spent_kobo"] / 100,
+        total_credits_purchased=totals["credits_purchased"],
+        successful_payments=totals["successful_payments"],
+        total_payments=totals["total_payments"],
+        next_cursor=next_cursor,
     )
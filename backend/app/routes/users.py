@@ -2,14 +2,21 @@
 User router for user-related endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_principal, get_current_user
+from app.auth.principal import Principal
+from app.config import get_settings
 from app.database import get_async_db
 from app.models.user import User
+from app.read_routing import read_session
 from app.schemas.user import UserProfile, UserResponse, UserUpdate
+from app.services.profile_cache import profile_cache
 from app.services.user_service import UserService
+from app.utils import etag_matches
+
+settings = get_settings()
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -39,7 +46,7 @@ async def get_current_user_profile(
 )
 async def update_current_user(
     update_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> UserResponse:
     """
@@ -48,7 +55,7 @@ async def update_current_user(
     Only provided fields will be updated. Fields not provided remain unchanged.
     """
     user_service = UserService(db)
-    updated_user = await user_service.update(current_user.id, update_data)
+    updated_user = await user_service.update(principal.id, update_data)
     
     if not updated_user:
         raise HTTPException(
@@ -67,12 +74,14 @@ async def update_current_user(
 )
 async def get_user_profile(
     user_id: str,
-    db: AsyncSession = Depends(get_async_db)
-) -> UserProfile:
+    request: Request
+) -> Response:
     """
     Get a user's public profile.
     
-    Returns limited public information about the user.
+    Returns limited public information about the user. Served from the
+    profile cache with an ETag; a matching ``If-None-Match`` gets 304 Not
+    Modified.
     """
     from uuid import UUID
     
@@ -84,16 +93,27 @@ async def get_user_profile(
             detail="Invalid user ID format"
         )
     
-    user_service = UserService(db)
-    user = await user_service.get_by_id(user_uuid)
+    # Reads for a user who just updated their profile go to the primary, so
+    # a lagging replica cannot refill the cache with the old version
+    async with read_session(user_uuid) as db:
+        profile = await profile_cache.get(db, user_uuid)
     
-    if not user:
+    if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return UserProfile.model_validate(user)
+    max_age = settings.PROFILE_CACHE_MAX_AGE_SECONDS
+    headers = {
+        "ETag": profile.etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={max_age}",
+    }
+    
+    if etag_matches(request.headers.get("if-none-match"), profile.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=profile.body, media_type="application/json", headers=headers)
 
 
 @router.delete(
@@ -103,7 +123,7 @@ async def get_user_profile(
     description="Delete the currently authenticated user's account."
 )
 async def delete_current_user(
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_async_db)
 ) -> None:
     """
@@ -112,7 +132,7 @@ async def delete_current_user(
     This action is irreversible. All user data will be permanently deleted.
     """
     user_service = UserService(db)
-    success = await user_service.delete(current_user.id)
+    success = await user_service.delete(principal.id)
     
     if not success:
         raise HTTPException(
@@ -90,9 +90,10 @@ class CreditPurchaseResponse(BaseModel):
 class CreditHistoryResponse(BaseModel):
     """Schema for credit history response."""
     transactions: list[CreditTransactionResponse]
-    total_count: int
+    total_count: Optional[int] = None  # Only when include_total is requested
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
 
 # Credit Summary Schema
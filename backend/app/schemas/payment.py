@@ -86,9 +86,10 @@ class PaymentDetailResponse(PaymentResponse):
 class PaymentListResponse(BaseModel):
     """Schema for payment list response."""
     payments: list[PaymentResponse]
-    total_count: int
+    total_count: Optional[int] = None  # Only when include_total is requested
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
 
 # Payment Verify Schema
@@ -111,6 +112,9 @@ class PaystackWebhookPayload(BaseModel):
 # Transaction History Schema
 class TransactionHistoryResponse(BaseModel):
     """Schema for transaction history response."""
-    payments: list[PaymentResponse]
+    payments: list[PaymentResponse]  # Most recent first, up to payments_limit
     total_spent_naira: float
     total_credits_purchased: int
+    successful_payments: int
+    total_payments: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch more payments
@@ -2,8 +2,12 @@
 Service layer for business logic.
 """
 
+from app.services.account_purge import purge_deleted_users
 from app.services.credit_service import CreditService
+from app.services.package_catalog import PackageCatalog, package_catalog
 from app.services.payment_service import PaymentService, PaystackClient
+from app.services.payment_sweep_service import PendingPaymentSweeper, sweep_pending_payments
+from app.services.reconciliation_service import LedgerReconciliationService, reconcile_ledger
 from app.services.user_service import UserService
 
 __all__ = [
@@ -11,4 +15,11 @@ __all__ = [
     "CreditService",
     "PaymentService",
     "PaystackClient",
+    "PackageCatalog",
+    "package_catalog",
+    "LedgerReconciliationService",
+    "reconcile_ledger",
+    "PendingPaymentSweeper",
+    "sweep_pending_payments",
+    "purge_deleted_users",
 ]
@@ -0,0 +1,111 @@
+"""
+Background purge of deleted accounts.
+
+Accounts too large to delete inside a request are deactivated and marked
+with ``deleted_at``. This job removes their data in bounded batches, one
+short transaction each, so no single statement holds locks on thousands
+of rows. Each batch deletes parent rows and lets ``ON DELETE CASCADE``
+remove their children; the user row goes last.
+"""
+
+import logging
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.background import advisory_lock, db_session, register_periodic_task
+from app.config import get_settings
+from app.models.credit import CreditTransaction
+from app.models.interview import Interview
+from app.models.payment import Payment
+from app.models.presentation import Presentation
+from app.models.user import User
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Advisory lock key so only one worker process runs the purge
+USER_PURGE_LOCK_KEY = 0x5A9C0003
+
+# Ledger entries go before payments so deleting payments has nothing to SET NULL
+PURGE_ORDER = (CreditTransaction, Payment, Interview, Presentation)
+
+
+async def purge_user(db: AsyncSession, user_id: UUID, batch_size: int) -> int:
+    """
+    Delete a deactivated user's data in batches, then the user.
+    
+    Args:
+        db: Database session.
+        user_id: The user to purge.
+        batch_size: Parent rows deleted per transaction.
+    
+    Returns:
+        Number of parent rows deleted, not counting cascaded children.
+    """
+    deleted = 0
+    for model in PURGE_ORDER:
+        while True:
+            batch = select(model.id).where(model.user_id == user_id).limit(batch_size)
+            result = await db.execute(
+                delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    
+    # Credits and anything left cascade from the user row
+    await db.execute(
+        delete(User)
+        .where(User.id == user_id, User.deleted_at.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return deleted
+
+
+async def purge_deleted_users(batch_size: int = 500, max_users: int = 10) -> dict[str, Any]:
+    """
+    Purge accounts awaiting deletion, oldest first.
+    
+    Args:
+        batch_size: Parent rows deleted per transaction.
+        max_users: Accounts purged per run.
+    
+    Returns:
+        Summary of the run.
+    """
+    async with db_session() as db:
+        result = await db.execute(
+            select(User.id)
+            .where(User.deleted_at.is_not(None))
+            .order_by(User.deleted_at)
+            .limit(max_users)
+        )
+        user_ids = list(result.scalars().all())
+        
+        rows = 0
+        for user_id in user_ids:
+            rows += await purge_user(db, user_id, batch_size)
+    
+    return {"users": len(user_ids), "rows": rows}
+
+
+async def _scheduled_purge() -> None:
+    """Run the purge from one worker process at a time."""
+    async with advisory_lock(USER_PURGE_LOCK_KEY) as locked:
+        if not locked:
+            return
+        summary = await purge_deleted_users(batch_size=settings.USER_PURGE_BATCH_SIZE)
+        if summary["users"]:
+            logger.info("Purged deleted accounts: %s", summary)
+
+
+register_periodic_task(
+    "deleted-account-purge",
+    settings.USER_PURGE_SECONDS,
+    _scheduled_purge,
+)
@@ -3,12 +3,15 @@ Credit service for handling credit operations.
 """
 
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from sqlalchemy import desc, func, select
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONPATH, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.credit import Credit, CreditTransaction, TransactionStatus, TransactionType
+from app.schemas.credit import CreditTransactionResponse
+from app.services.pagination import paginate_by_created
 
 
 class CreditService:
@@ -18,12 +21,29 @@ class CreditService:
     INTERVIEW_CREDIT_COST = 10
     PRESENTATION_CREDIT_COST = 15
     
+    # Ledger entries kept on the credit row for the summary
+    RECENT_TRANSACTIONS_LIMIT = 5
+    
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    async def get_credit(self, user_id: UUID) -> Optional[Credit]:
+        """Get a user's credit record without creating it; safe on read-only sessions."""
+        result = await self.db.execute(
+            select(Credit)
+            .where(Credit.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+    
     async def get_or_create_credit(self, user_id: UUID) -> Credit:
         """Get or create credit record for user."""
-        result = await self.db.execute(select(Credit).where(Credit.user_id == user_id))
+        # Balances change through UPDATE statements, so never trust the identity map
+        result = await self.db.execute(
+            select(Credit)
+            .where(Credit.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
         credit = result.scalar_one_or_none()
         
         if not credit:
@@ -39,6 +59,29 @@ class CreditService:
         
         return credit
     
+    @staticmethod
+    def _recent_entry(transaction: CreditTransaction):
+        """Build the JSONB summary entry for a ledger row being written."""
+        return func.jsonb_build_object(
+            "id", str(transaction.id),
+            "amount", transaction.amount,
+            "type", transaction.type.value,
+            "status", transaction.status.value,
+            "simulation_type", transaction.simulation_type,
+            "simulation_id", str(transaction.simulation_id) if transaction.simulation_id else None,
+            "package_name", transaction.package_name,
+            "description", transaction.description,
+            # now() is the transaction start time, matching the ledger row's created_at
+            "created_at", func.now(),
+        )
+    
+    def _push_recent(self, transaction: CreditTransaction):
+        """SQL expression prepending a ledger entry to the bounded recent list."""
+        return func.jsonb_path_query_array(
+            func.jsonb_build_array(self._recent_entry(transaction)).op("||")(Credit.recent_transactions),
+            literal(f"$[0 to {self.RECENT_TRANSACTIONS_LIMIT - 1}]").cast(JSONPATH),
+        )
+    
     async def get_balance(self, user_id: UUID) -> int:
         """Get user's credit balance."""
         credit = await self.get_or_create_credit(user_id)
@@ -46,7 +89,7 @@ class CreditService:
     
     async def has_sufficient_credits(self, user_id: UUID, amount: int) -> bool:
         """Check if user has sufficient credits."""
-        balance = await get_balance(self, user_id)
+        balance = await self.get_balance(user_id)
         return balance >= amount
     
     async def add_credits(
@@ -58,16 +101,20 @@ class CreditService:
         payment_id: Optional[UUID] = None,
         package_name: Optional[str] = None,
         metadata_json: Optional[str] = None,
+        commit: bool = True,
     ) -> CreditTransaction:
-        """Add credits to user's account."""
-        credit = await self.get_or_create_credit(user_id)
+        """
+        Add credits to user's account.
         
-        # Update balance
-        credit.add_credits(amount)
+        The balance is incremented in the database with a single upsert, so
+        concurrent grants never overwrite each other. The summary's recent
+        transactions are updated by the same statement.
         
-        # Create transaction record
+        Pass ``commit=False`` to make the grant part of the caller's
+        transaction; it is flushed but left for the caller to commit.
+        """
         transaction = CreditTransaction(
-            credit_id=credit.id,
+            id=uuid4(),
             user_id=user_id,
             amount=amount,
             type=transaction_type,
@@ -78,33 +125,60 @@ class CreditService:
             metadata_json=metadata_json,
         )
         
+        result = await self.db.execute(
+            insert(Credit)
+            .values(
+                user_id=user_id,
+                balance=amount,
+                lifetime_earned=amount,
+                lifetime_used=0,
+                recent_transactions=func.jsonb_build_array(self._recent_entry(transaction)),
+            )
+            .on_conflict_do_update(
+                index_elements=[Credit.user_id],
+                set_={
+                    "balance": Credit.balance + amount,
+                    "lifetime_earned": Credit.lifetime_earned + amount,
+                    "recent_transactions": self._push_recent(transaction),
+                    "updated_at": func.now(),
+                },
+            )
+            .returning(Credit.id)
+        )
+        transaction.credit_id = result.scalar_one()
+        
+        # Record the ledger entry in the same transaction
         self.db.add(transaction)
+        if not commit:
+            await self.db.flush()
+            return transaction
+        
         await self.db.commit()
         await self.db.refresh(transaction)
         
         return transaction
     
-    async def deduct_credits(
+    async def _debit(
         self,
         user_id: UUID,
         amount: int,
         simulation_type: str,
         simulation_id: UUID,
         description: Optional[str] = None,
-    ) -> Optional[CreditTransaction]:
+    ) -> Optional[tuple[CreditTransaction, int]]:
         """
-        Deduct credits from user's account.
-        Returns transaction if successful, None if insufficient balance.
-        """
-        credit = await self.get_or_create_credit(user_id)
+        Atomically deduct credits and record the ledger entry.
         
-        # Check balance
-        if not credit.deduct_credits(amount):
-            return None
+        The balance check, decrement and summary update are one conditional
+        UPDATE, so concurrent deductions can never overdraw the account.
         
-        # Create transaction record (negative amount for deduction)
+        Returns:
+            The transaction and remaining balance, or None if insufficient.
+            An insufficient balance leaves the session's transaction as it was.
+        """
+        # Negative amount for deduction
         transaction = CreditTransaction(
-            credit_id=credit.id,
+            id=uuid4(),
             user_id=user_id,
             amount=-amount,
             type=TransactionType.USAGE,
@@ -114,8 +188,48 @@ class CreditService:
             description=description or f"Used for {simulation_type}",
         )
         
+        result = await self.db.execute(
+            update(Credit)
+            .where(Credit.user_id == user_id, Credit.balance >= amount)
+            .values(
+                balance=Credit.balance - amount,
+                lifetime_used=Credit.lifetime_used + amount,
+                recent_transactions=self._push_recent(transaction),
+                updated_at=func.now(),
+            )
+            .returning(Credit.id, Credit.balance)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        if row is None:
+            # Nothing was changed; leave the caller's pending work alone
+            return None
+        
+        transaction.credit_id, balance = row
+        
+        # Record the ledger entry in the same transaction
         self.db.add(transaction)
         await self.db.commit()
+        
+        return transaction, balance
+    
+    async def deduct_credits(
+        self,
+        user_id: UUID,
+        amount: int,
+        simulation_type: str,
+        simulation_id: UUID,
+        description: Optional[str] = None,
+    ) -> Optional[CreditTransaction]:
+        """
+        Deduct credits from user's account.
+        Returns transaction if successful, None if insufficient balance.
+        """
+        debited = await self._debit(user_id, amount, simulation_type, simulation_id, description)
+        if debited is None:
+            return None
+        
+        transaction, _ = debited
         await self.db.refresh(transaction)
         
         return transaction
@@ -138,19 +252,19 @@ class CreditService:
         else:
             return False, 0
         
-        # Try to deduct
-        transaction = await self.deduct_credits(
+        # Try to deduct; the UPDATE returns the remaining balance
+        debited = await self._debit(
             user_id=user_id,
             amount=cost,
             simulation_type=simulation_type,
             simulation_id=simulation_id,
         )
         
-        if not transaction:
+        if debited is None:
             balance = await self.get_balance(user_id)
             return False, balance
         
-        balance = await self.get_balance(user_id)
+        _, balance = debited
         return True, balance
     
     async def get_transaction_history(
@@ -158,37 +272,62 @@ class CreditService:
         user_id: UUID,
         page: int = 1,
         page_size: int = 20,
-    ) -> tuple[list[CreditTransaction], int]:
-        """Get user's transaction history."""
-        # Get total count
-        count_result = await self.db.execute(
-            select(func.count()).where(CreditTransaction.user_id == user_id)
-        )
-        total_count = count_result.scalar()
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[list[CreditTransaction], Optional[str], Optional[int]]:
+        """
+        Get user's transaction history, newest first.
         
-        # Get transactions
-        offset = (page - 1) * page_size
-        result = await self.db.execute(
-            select(CreditTransaction)
-            .where(CreditTransaction.user_id == user_id)
-            .order_by(desc(CreditTransaction.created_at))
-            .offset(offset)
-            .limit(page_size)
+        Returns (transactions, next_cursor, total_count). ``cursor`` continues
+        from a previous page; ``page`` is only used when no cursor is given.
+        """
+        return await paginate_by_created(
+            self.db,
+            select(CreditTransaction).where(CreditTransaction.user_id == user_id),
+            CreditTransaction,
+            page_size=page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
+            include_total=include_total,
         )
-        
-        transactions = list(result.scalars().all())
-        return transactions, total_count
     
     async def get_credit_summary(self, user_id: UUID) -> dict:
-        """Get credit summary for user."""
+        """
+        Get credit summary for user.
+        
+        Served from the credit row alone; recent transactions are kept up to
+        date by every ledger write.
+        """
         credit = await self.get_or_create_credit(user_id)
         
-        # Get recent transactions
-        transactions, _ = await self.get_transaction_history(user_id, page=1, page_size=5)
+        recent_transactions = credit.recent_transactions
+        if not recent_transactions and (credit.lifetime_earned or credit.lifetime_used):
+            recent_transactions = await self._backfill_recent_transactions(credit)
         
         return {
             "current_balance": credit.balance,
             "total_earned": credit.lifetime_earned,
             "total_used": credit.lifetime_used,
-            "recent_transactions": transactions,
+            "recent_transactions": recent_transactions,
         }
+    
+    async def _backfill_recent_transactions(self, credit: Credit) -> list:
+        """Populate the recent transactions of a row written before they were tracked."""
+        transactions, _, _ = await self.get_transaction_history(
+            credit.user_id, page_size=self.RECENT_TRANSACTIONS_LIMIT
+        )
+        entries = [
+            CreditTransactionResponse.model_validate(transaction).model_dump(mode="json")
+            for transaction in transactions
+        ]
+        
+        # Only fill an empty list so a concurrent ledger write is never overwritten
+        await self.db.execute(
+            update(Credit)
+            .where(Credit.id == credit.id, Credit.recent_transactions == func.jsonb_build_array())
+            .values(recent_transactions=entries)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        
+        return entries
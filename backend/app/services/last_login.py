@@ -0,0 +1,116 @@
+"""
+Write-behind buffer for users' last login times.
+
+Logins only record the time in memory; a periodic flush writes all pending
+times in one ``UPDATE ... FROM (VALUES ...)`` per chunk. Login latency no
+longer includes a write transaction, and the users table takes one write
+per flush instead of one per login. ``last_login`` may therefore lag by up
+to one flush interval.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import DateTime, column, func, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.background import db_session, register_periodic_task
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.user import User
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE statement
+FLUSH_CHUNK_SIZE = 1000
+
+
+class LastLoginBuffer:
+    """Coalesces last-login updates in memory until the next flush."""
+    
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._pending: dict[UUID, datetime] = {}
+        self._lock = asyncio.Lock()
+        self._early_flush: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+    
+    def record(self, user_id: UUID, at: Optional[datetime] = None) -> None:
+        """Record a login; repeated logins before a flush collapse into one row."""
+        self._pending[user_id] = at or datetime.now(timezone.utc)
+        self.recorded += 1
+        # Flush early rather than let the buffer grow without bound
+        if len(self._pending) >= self.max_pending and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.create_task(self._flush_logged())
+    
+    async def flush(self) -> int:
+        """
+        Write all pending login times.
+        
+        Times never move backwards, and ``updated_at`` is left alone since a
+        login is not a profile change. If the write fails, the times are
+        kept for the next flush.
+        
+        Returns:
+            Number of users updated.
+        """
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            
+            items = list(pending.items())
+            try:
+                async with db_session() as db:
+                    for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+                        logins = values(
+                            column("user_id", PG_UUID(as_uuid=True)),
+                            column("last_login", DateTime(timezone=True)),
+                            name="logins",
+                        ).data(items[start:start + FLUSH_CHUNK_SIZE])
+                        await db.execute(
+                            update(User)
+                            .where(User.id == logins.c.user_id)
+                            .values(
+                                last_login=func.greatest(User.last_login, logins.c.last_login),
+                                # Keep the column's onupdate from firing
+                                updated_at=User.updated_at,
+                            )
+                            .execution_options(synchronize_session=False)
+                        )
+                    await db.commit()
+            except BaseException:
+                # Keep anything newer recorded while the flush was running
+                for user_id, at in pending.items():
+                    self._pending.setdefault(user_id, at)
+                raise
+            
+            self.flushes += 1
+            self.flushed += len(items)
+            return len(items)
+    
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Last login flush failed")
+    
+    def stats(self) -> dict[str, Any]:
+        """Get buffer counters."""
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+        }
+
+
+last_login_buffer = LastLoginBuffer(max_pending=settings.LAST_LOGIN_MAX_PENDING)
+register_stats("last_login", last_login_buffer.stats)
+register_periodic_task("last-login-flush", settings.LAST_LOGIN_FLUSH_SECONDS, last_login_buffer.flush)
@@ -0,0 +1,162 @@
+"""
+Process-wide catalog of credit packages.
+
+Packages change rarely and are read on every pricing page and summary view,
+so the active list is loaded once and kept as response models plus
+pre-rendered JSON bytes with a strong ETag. A version counter is bumped
+whenever the contents change; other processes pick up changes by
+periodically revalidating a cheap fingerprint of the table.
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.background import db_session, register_periodic_task
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.payment import CreditPackage
+from app.schemas.credit import CreditPackageResponse
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the active packages at one catalog version."""
+    
+    version: int
+    packages: tuple[CreditPackageResponse, ...]
+    body: bytes
+    etag: str
+
+
+def _package_response(package: CreditPackage) -> CreditPackageResponse:
+    return CreditPackageResponse(
+        id=package.id,
+        name=package.name,
+        slug=package.slug,
+        description=package.description,
+        price_kobo=package.price_kobo,
+        price_naira=package.price_naira,
+        currency=package.currency,
+        credits_amount=package.credits_amount,
+        bonus_credits=package.bonus_credits,
+        total_credits=package.total_credits,
+        features=package.features or [],
+        is_popular=package.is_popular == "Y",
+        is_active=package.is_active == "Y",
+        display_order=package.display_order,
+    )
+
+
+class PackageCatalog:
+    """Lazily loaded, versioned cache of the active credit packages."""
+    
+    def __init__(self):
+        self.version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._fingerprint: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+        self.loads = 0
+        self.hits = 0
+    
+    async def _read_fingerprint(self, db: AsyncSession) -> tuple:
+        result = await db.execute(
+            select(func.count(), func.max(CreditPackage.updated_at)).select_from(CreditPackage)
+        )
+        return tuple(result.one())
+    
+    async def _load(self, db: AsyncSession) -> CatalogSnapshot:
+        fingerprint = await self._read_fingerprint(db)
+        result = await db.execute(
+            select(CreditPackage)
+            .where(CreditPackage.is_active == "Y")
+            .order_by(CreditPackage.display_order)
+        )
+        packages = tuple(_package_response(package) for package in result.scalars().all())
+        body = json.dumps(
+            [package.model_dump(mode="json") for package in packages],
+            separators=(",", ":"),
+        ).encode()
+        
+        self.loads += 1
+        if self._snapshot is None or body != self._snapshot.body:
+            self.version += 1
+        self._snapshot = CatalogSnapshot(
+            version=self.version,
+            packages=packages,
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+        self._fingerprint = fingerprint
+        return self._snapshot
+    
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        """
+        Get the current catalog, loading it on first use.
+        
+        Concurrent callers during a load wait for the same query.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        
+        async with self._lock:
+            if self._snapshot is None:
+                return await self._load(db)
+            return self._snapshot
+    
+    async def revalidate(self, db: AsyncSession) -> bool:
+        """
+        Reload the catalog if the packages table changed.
+        
+        Returns:
+            True if the catalog was reloaded.
+        """
+        if self._snapshot is None:
+            return False
+        
+        if await self._read_fingerprint(db) == self._fingerprint:
+            return False
+        
+        async with self._lock:
+            await self._load(db)
+        return True
+    
+    def invalidate(self) -> None:
+        """Drop the catalog so the next read reloads it, e.g. after editing packages."""
+        self._snapshot = None
+        self._fingerprint = None
+    
+    def stats(self) -> dict[str, Any]:
+        """Get catalog counters."""
+        return {
+            "version": self.version,
+            "loaded": self._snapshot is not None,
+            "packages": len(self._snapshot.packages) if self._snapshot else 0,
+            "loads": self.loads,
+            "hits": self.hits,
+        }
+
+
+package_catalog = PackageCatalog()
+register_stats("package_catalog", package_catalog.stats)
+
+
+async def _revalidate_catalog() -> None:
+    async with db_session() as db:
+        await package_catalog.revalidate(db)
+
+
+register_periodic_task(
+    "package-catalog-revalidate",
+    settings.PACKAGE_CATALOG_REVALIDATE_SECONDS,
+    _revalidate_catalog,
+)
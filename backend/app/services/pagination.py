@@ -0,0 +1,70 @@
+"""
+Keyset pagination for history endpoints.
+
+Pages are ordered newest first on ``(created_at, id)`` and continue from an
+opaque cursor, so fetching a page costs the same however deep it is.
+"""
+
+from typing import Any, Optional
+
+from sqlalchemy import Select, desc, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.exceptions import BadRequestException
+from app.utils import decode_cursor, encode_cursor
+
+
+async def paginate_by_created(
+    db: AsyncSession,
+    stmt: Select,
+    model: Any,
+    page_size: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    include_total: bool = False,
+) -> tuple[list[Any], Optional[str], Optional[int]]:
+    """
+    Fetch one page of a model, newest first.
+    
+    Args:
+        db: Database session.
+        stmt: A filtered ``select(model)`` without ordering or limits.
+        model: Mapped class with ``created_at`` and ``id`` columns.
+        page_size: Maximum number of rows to return.
+        cursor: Cursor from a previous page; takes precedence over ``offset``.
+        offset: Rows to skip when no cursor is given (legacy page numbers).
+        include_total: Whether to also count all matching rows.
+    
+    Returns:
+        Tuple of (rows, next page cursor or None, total count or None).
+    
+    Raises:
+        BadRequestException: If the cursor is malformed.
+    """
+    total_count = None
+    if include_total:
+        count_result = await db.execute(
+            select(func.count()).select_from(stmt.order_by(None).subquery())
+        )
+        total_count = count_result.scalar()
+    
+    page_stmt = stmt.order_by(desc(model.created_at), desc(model.id))
+    if cursor:
+        try:
+            created_at, row_id = decode_cursor(cursor)
+        except ValueError:
+            raise BadRequestException("Invalid cursor")
+        page_stmt = page_stmt.where(tuple_(model.created_at, model.id) < (created_at, row_id))
+    elif offset:
+        page_stmt = page_stmt.offset(offset)
+    
+    # Fetch one extra row to learn whether another page follows
+    result = await db.execute(page_stmt.limit(page_size + 1))
+    rows = list(result.scalars().all())
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return rows, next_cursor, total_count
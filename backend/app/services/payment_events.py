@@ -0,0 +1,76 @@
+"""
+In-process pub/sub for payment status changes.
+
+Whatever settles a payment in this process (verification, webhook worker,
+pending sweep) publishes its new status here, and open
+``/payments/{reference}/events`` streams are woken immediately instead of
+the client polling the verify endpoint. Streams still re-read the payment
+periodically to catch changes made by other worker processes.
+"""
+
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from app.metrics import register_stats
+
+
+class PaymentEventBroker:
+    """Fan-out of payment status events to subscribers, keyed by reference."""
+    
+    # Subscribers only need the latest status; older queued events are dropped
+    QUEUE_SIZE = 8
+    
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+    
+    @contextmanager
+    def subscribe(self, reference: str) -> Iterator[asyncio.Queue]:
+        """
+        Receive events for a payment while the context is open.
+        
+        Yields:
+            Queue of event dicts published for ``reference``.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers[reference].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(reference)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[reference]
+    
+    def publish(self, reference: str, event: dict[str, Any]) -> int:
+        """
+        Deliver an event to every subscriber of a payment.
+        
+        Returns:
+            Number of subscribers notified.
+        """
+        self.published += 1
+        subscribers = self._subscribers.get(reference, ())
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+        return len(subscribers)
+    
+    def stats(self) -> dict[str, Any]:
+        """Get subscriber and event counters."""
+        return {
+            "references": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+payment_events = PaymentEventBroker()
+register_stats("payment_events", payment_events.stats)
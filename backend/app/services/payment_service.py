@@ -2,21 +2,32 @@
 Payment service for handling payments and credit purchases.
 """
 
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
 import uuid
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 from uuid import UUID
 
-import httpx
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.background import db_session
+from app.database import track_user_writes
 from app.config import get_settings
+from app.http_clients import http_clients
+from app.metrics import register_stats
 from app.models.credit import TransactionType
 from app.models.payment import CreditPackage, Payment, PaymentStatus
 from app.services.credit_service import CreditService
+from app.services.pagination import paginate_by_created
+from app.services.payment_events import payment_events
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class PaystackClient:
@@ -24,6 +35,9 @@ class PaystackClient:
     
     BASE_URL = settings.PAYSTACK_BASE_URL
     
+    # Name of the pooled client in the HTTP client registry
+    CLIENT_NAME = "paystack"
+    
     def __init__(self):
         self.secret_key = settings.PAYSTACK_SECRET_KEY
         self.headers = {
@@ -40,8 +54,6 @@ class PaystackClient:
         metadata: Optional[dict] = None,
     ) -> dict:
         """Initialize a payment transaction."""
-        url = f"{self.BASE_URL}/transaction/initialize"
-        
         payload = {
             "email": email,
             "amount": amount_kobo,
@@ -53,19 +65,57 @@ class PaystackClient:
         if metadata:
             payload["metadata"] = metadata
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await http_clients.request(self.CLIENT_NAME, "POST", "/transaction/initialize", json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def verify_webhook_signature(self, body: bytes, signature: Optional[str]) -> bool:
+        """Check the x-paystack-signature header: HMAC-SHA512 of the raw body."""
+        if not signature:
+            return False
+        expected = hmac.new(self.secret_key.encode(), body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, signature)
+    
+    async def list_transactions(
+        self,
+        start: datetime,
+        end: datetime,
+        page: int = 1,
+        per_page: int = 100,
+    ) -> dict:
+        """List transactions created in a time window, one page at a time."""
+        params = {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "page": page,
+            "perPage": per_page,
+        }
+        response = await http_clients.request(self.CLIENT_NAME, "GET", "/transaction", params=params)
+        response.raise_for_status()
+        return response.json()
     
     async def verify_transaction(self, reference: str) -> dict:
         """Verify a payment transaction."""
-        url = f"{self.BASE_URL}/transaction/verify/{reference}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await http_clients.request(self.CLIENT_NAME, "GET", f"/transaction/verify/{reference}")
+        response.raise_for_status()
+        return response.json()
+
+
+def payment_status_event(payment: Payment) -> dict[str, Any]:
+    """Build the event published when a payment's status changes."""
+    return {
+        "reference": payment.paystack_reference,
+        "status": payment.status.value,
+        "credits_purchased": payment.credits_purchased,
+    }
+
+
+paystack_client = PaystackClient()
+http_clients.register(
+    PaystackClient.CLIENT_NAME,
+    base_url=PaystackClient.BASE_URL,
+    headers=paystack_client.headers,
+)
 
 
 class PaymentService:
@@ -73,7 +123,7 @@ class PaymentService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.paystack = PaystackClient()
+        self.paystack = paystack_client
         self.credit_service = CreditService(db)
     
     async def get_credit_package(self, slug: str) -> Optional[CreditPackage]:
@@ -83,6 +133,14 @@ class PaymentService:
         )
         return result.scalar_one_or_none()
     
+    async def get_payment_by_reference(self, reference: str, user_id: Optional[UUID] = None) -> Optional[Payment]:
+        """Get a payment by its Paystack reference, optionally only if it belongs to ``user_id``."""
+        query = select(Payment).where(Payment.paystack_reference == reference)
+        if user_id is not None:
+            query = query.where(Payment.user_id == user_id)
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+    
     async def get_all_credit_packages(self) -> list[CreditPackage]:
         """Get all active credit packages."""
         result = await self.db.execute(
@@ -143,7 +201,7 @@ class PaymentService:
                 }
             else:
                 raise Exception("Paystack initialization failed")
-                
+        
         except Exception as e:
             # Update payment status to failed
             payment.status = PaymentStatus.FAILED
@@ -151,69 +209,139 @@ class PaymentService:
             await self.db.commit()
             raise
     
-    async def verify_payment(self, reference: str) -> tuple[bool, Payment]:
+    async def verify_payment(self, reference: str, use_cache: bool = True) -> tuple[bool, Payment]:
         """
         Verify a payment and process credits if successful.
         Returns (success, payment).
+        
+        Concurrent verifications of the same reference in this process share
+        one gateway call, and a recent "still pending" answer from the
+        gateway is reused unless ``use_cache`` is False; see ``PaymentVerifier``.
+        """
+        await payment_verifier.verify(reference, use_cache=use_cache)
+        
+        result = await self.db.execute(
+            select(Payment)
+            .where(Payment.paystack_reference == reference)
+            .execution_options(populate_existing=True)
+        )
+        payment = result.scalar_one_or_none()
+        if not payment:
+            raise ValueError("Payment not found")
+        return payment.status == PaymentStatus.SUCCESS, payment
+    
+    async def apply_gateway_result(self, payment: Payment, data: dict) -> Optional[bool]:
+        """
+        Apply a Paystack transaction record to a payment, without committing.
+        
+        A successful transaction marks the payment paid and grants its
+        credits in the session's transaction, so the caller's commit applies
+        both or neither.
+        
+        Args:
+            payment: The payment, locked by the caller.
+            data: The transaction object from the Paystack API.
+        
+        Returns:
+            True if the payment succeeded, False if it failed, None if the
+            transaction is still pending.
+        """
+        gateway_status = data.get("status")
+        
+        if gateway_status == "success":
+            # Update payment
+            payment.status = PaymentStatus.SUCCESS
+            payment.paystack_transaction_id = str(data.get("id"))
+            payment.paid_at = datetime.now(timezone.utc)
+            payment.gateway_response = str(data)
+            
+            if data.get("channel"):
+                payment.payment_method = data.get("channel")
+            
+            # Add credits to user
+            await self.credit_service.add_credits(
+                user_id=payment.user_id,
+                amount=payment.credits_purchased,
+                transaction_type=TransactionType.PURCHASE,
+                description=f"Purchased {payment.package_name}",
+                payment_id=payment.id,
+                package_name=payment.package_name,
+                commit=False,
+            )
+            return True
+        
+        elif gateway_status == "failed":
+            payment.status = PaymentStatus.FAILED
+            payment.failed_at = datetime.now(timezone.utc)
+            payment.failure_message = data.get("gateway_response", "Payment failed")
+            return False
+        
+        return None
+    
+    async def _verify_locked(self, reference: str) -> Optional[bool]:
+        """
+        Verify a payment with Paystack while holding its row lock.
+        
+        The lock serializes verifications across processes: whoever gets it
+        second sees the committed result and skips the gateway. The payment
+        update and the credit grant are committed together.
+        
+        A gateway or transport error leaves the payment pending, with the
+        error in ``failure_message``, so a later verification or the sweep
+        can still settle it. Only Paystack reporting the transaction failed
+        marks it FAILED.
+        
+        Returns:
+            True if the payment succeeded, False if it failed, None if the
+            gateway still reports it pending.
+        
+        Raises:
+            ValueError: If no payment has this reference.
         """
-        # Get payment record
         result = await self.db.execute(
-            select(Payment).where(Payment.paystack_reference == reference)
+            select(Payment)
+            .where(Payment.paystack_reference == reference)
+            .with_for_update()
+            .execution_options(populate_existing=True)
         )
         payment = result.scalar_one_or_none()
         
         if not payment:
+            await self.db.rollback()
             raise ValueError("Payment not found")
         
         # If already processed, return current status
         if payment.status == PaymentStatus.SUCCESS:
-            return True, payment
+            await self.db.rollback()
+            return True
         
         # Verify with Paystack
+        payment_id = payment.id
         try:
             verify_response = await self.paystack.verify_transaction(reference)
             
             if verify_response.get("status"):
-                data = verify_response["data"]
-                gateway_status = data.get("status")
-                
-                if gateway_status == "success":
-                    # Update payment
-                    payment.status = PaymentStatus.SUCCESS
-                    payment.paystack_transaction_id = str(data.get("id"))
-                    payment.paid_at = datetime.now(timezone.utc)
-                    payment.gateway_response = str(data)
-                    
-                    if data.get("channel"):
-                        payment.payment_method = data.get("channel")
-                    
-                    await self.db.commit()
-                    
-                    # Add credits to user
-                    await self.credit_service.add_credits(
-                        user_id=payment.user_id,
-                        amount=payment.credits_purchased,
-                        transaction_type=TransactionType.PURCHASE,
-                        description=f"Purchased {payment.package_name}",
-                        payment_id=payment.id,
-                        package_name=payment.package_name,
-                    )
-                    
-                    return True, payment
-                    
-                elif gateway_status == "failed":
-                    payment.status = PaymentStatus.FAILED
-                    payment.failed_at = datetime.now(timezone.utc)
-                    payment.failure_message = data.get("gateway_response", "Payment failed")
+                outcome = await self.apply_gateway_result(payment, verify_response["data"])
+                if outcome is not None:
+                    track_user_writes(self.db, payment.user_id)
+                    event = payment_status_event(payment)
                     await self.db.commit()
-                    return False, payment
+                    payment_events.publish(reference, event)
+                    return outcome
             
             # Still pending or unknown status
-            return False, payment
-            
+            await self.db.rollback()
+            return None
+        
         except Exception as e:
-            payment.status = PaymentStatus.FAILED
-            payment.failure_message = str(e)
+            await self.db.rollback()
+            # The error says nothing about the payment itself; keep it pending
+            await self.db.execute(
+                update(Payment)
+                .where(Payment.id == payment_id, Payment.status == PaymentStatus.PENDING)
+                .values(failure_message=str(e), updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
             await self.db.commit()
             raise
     
@@ -222,42 +350,205 @@ class PaymentService:
         user_id: UUID,
         page: int = 1,
         page_size: int = 20,
-    ) -> tuple[list[Payment], int]:
-        """Get user's payment history."""
-        from sqlalchemy import desc, func
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[list[Payment], Optional[str], Optional[int]]:
+        """
+        Get user's payment history, newest first.
         
-        # Get total count
-        count_result = await self.db.execute(
-            select(func.count()).where(Payment.user_id == user_id)
+        Returns (payments, next_cursor, total_count). ``cursor`` continues
+        from a previous page; ``page`` is only used when no cursor is given.
+        """
+        return await paginate_by_created(
+            self.db,
+            select(Payment).where(Payment.user_id == user_id),
+            Payment,
+            page_size=page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
+            include_total=include_total,
         )
-        total_count = count_result.scalar()
+    
+    async def get_payment_totals(self, user_id: UUID) -> dict[str, int]:
+        """
+        Get a user's purchase totals, aggregated in the database.
         
-        # Get payments
-        offset = (page - 1) * page_size
+        Returns:
+            Dict with ``spent_kobo``, ``credits_purchased``,
+            ``successful_payments`` and ``total_payments``.
+        """
+        succeeded = Payment.status == PaymentStatus.SUCCESS
         result = await self.db.execute(
-            select(Payment)
-            .where(Payment.user_id == user_id)
-            .order_by(desc(Payment.created_at))
-            .offset(offset)
-            .limit(page_size)
+            select(
+                func.coalesce(func.sum(Payment.amount_kobo).filter(succeeded), 0).label("spent_kobo"),
+                func.coalesce(func.sum(Payment.credits_purchased).filter(succeeded), 0).label("credits_purchased"),
+                func.count().filter(succeeded).label("successful_payments"),
+                func.count().label("total_payments"),
+            ).where(Payment.user_id == user_id)
         )
-        
-        payments = list(result.scalars().all())
-        return payments, total_count
+        return dict(result.one()._mapping)
     
     async def handle_webhook(self, payload: dict) -> bool:
-        """Handle Paystack webhook."""
+        """
+        Handle a verified Paystack webhook event.
+        
+        Returns:
+            True if the event was acted on, False if it was ignored.
+        
+        Raises:
+            Exception: If processing failed and should be retried.
+        """
         event = payload.get("event")
         data = payload.get("data", {})
         
         if event == "charge.success":
             reference = data.get("reference")
             if reference:
-                try:
-                    await self.verify_payment(reference)
-                    return True
-                except Exception:
+                # Payments are stored before checkout starts, so an unknown
+                # reference is not ours and retrying cannot help
+                if await self.get_payment_by_reference(reference) is None:
+                    logger.warning("Ignoring Paystack webhook for unknown reference %s", reference)
                     return False
+                
+                # The gateway state just changed, so skip the pending cache
+                _, payment = await self.verify_payment(reference, use_cache=False)
+                if payment.status == PaymentStatus.PENDING:
+                    raise RuntimeError(f"Payment {reference} is still pending at the gateway")
+                return True
         
         # Handle other events as needed
         return False
+
+
+class PaymentVerifier:
+    """
+    Coalesces concurrent verifications of the same payment.
+    
+    The first caller for a reference starts the verification as a task on
+    its own session; callers arriving while it runs await the same task.
+    Running it detached means a disconnecting client cannot cancel the
+    verification for everyone else. A "still pending" answer is remembered
+    for ``pending_ttl_seconds`` so repeated checks right after checkout do
+    not each call the gateway.
+    """
+    
+    # Bound on remembered pending references; expired ones are pruned first
+    MAX_PENDING_ENTRIES = 10000
+    
+    def __init__(self, pending_ttl_seconds: float):
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._pending_until: dict[str, float] = {}
+        self.verifications = 0
+        self.coalesced = 0
+        self.pending_hits = 0
+    
+    async def _run(self, reference: str) -> Optional[bool]:
+        async with db_session() as db:
+            outcome = await PaymentService(db)._verify_locked(reference)
+        if outcome is None and self.pending_ttl_seconds > 0:
+            now = time.monotonic()
+            if len(self._pending_until) >= self.MAX_PENDING_ENTRIES:
+                self._pending_until = {key: until for key, until in self._pending_until.items() if until > now}
+            self._pending_until[reference] = now + self.pending_ttl_seconds
+        else:
+            self._pending_until.pop(reference, None)
+        return outcome
+    
+    def _finished(self, reference: str, task: asyncio.Task) -> None:
+        self._inflight.pop(reference, None)
+        # Mark the error as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+    
+    async def verify(self, reference: str, use_cache: bool = True) -> Optional[bool]:
+        """
+        Verify a payment, joining a verification already in progress.
+        
+        Args:
+            reference: The payment reference.
+            use_cache: Whether a recent "still pending" gateway answer may be
+                reused instead of asking the gateway again.
+        
+        Returns:
+            True if the payment succeeded, False if it failed, None if it is
+            still pending.
+        
+        Raises:
+            ValueError: If no payment has this reference.
+        """
+        if use_cache and self._pending_until.get(reference, 0) > time.monotonic():
+            self.pending_hits += 1
+            return None
+        
+        task = self._inflight.get(reference)
+        if task is None:
+            self.verifications += 1
+            task = asyncio.create_task(self._run(reference), name=f"verify-payment-{reference}")
+            self._inflight[reference] = task
+            task.add_done_callback(lambda done: self._finished(reference, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+    
+    def stats(self) -> dict[str, Any]:
+        """Get verification counters."""
+        return {
+            "in_flight": len(self._inflight),
+            "verifications": self.verifications,
+            "coalesced": self.coalesced,
+            "pending_cache_hits": self.pending_hits,
+            "pending_cached": len(self._pending_until),
+        }
+
+
+payment_verifier = PaymentVerifier(pending_ttl_seconds=settings.PAYMENT_VERIFY_PENDING_CACHE_SECONDS)
+register_stats("payment_verification", payment_verifier.stats)
+
+
+async def _read_status_event(reference: str) -> Optional[dict[str, Any]]:
+    async with db_session() as db:
+        result = await db.execute(select(Payment).where(Payment.paystack_reference == reference))
+        payment = result.scalar_one_or_none()
+        return payment_status_event(payment) if payment else None
+
+
+async def watch_payment_status(
+    reference: str,
+    recheck_seconds: float = settings.PAYMENT_EVENTS_RECHECK_SECONDS,
+    max_seconds: float = settings.PAYMENT_EVENTS_MAX_SECONDS,
+) -> AsyncIterator[Optional[dict[str, Any]]]:
+    """
+    Follow a payment's status until it settles, without calling the gateway.
+    
+    Changes made in this process arrive through ``payment_events`` at once;
+    the row is re-read every ``recheck_seconds`` to catch changes made by
+    other processes.
+    
+    Yields:
+        The current status event first, then each change, with None as a
+        heartbeat while the payment stays pending. Stops once the payment
+        is no longer pending or after ``max_seconds``.
+    """
+    pending = PaymentStatus.PENDING.value
+    deadline = time.monotonic() + max_seconds
+    
+    with payment_events.subscribe(reference) as queue:
+        # Read after subscribing so a change in between is not missed
+        event = await _read_status_event(reference)
+        if event is None:
+            return
+        yield event
+        
+        while event["status"] == pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(recheck_seconds, remaining))
+            except asyncio.TimeoutError:
+                event = await _read_status_event(reference) or event
+                if event["status"] == pending:
+                    yield None
+                    continue
+            yield event
@@ -0,0 +1,188 @@
+"""
+Pending payment sweep.
+
+Payments whose user closed the checkout tab, or whose webhook was lost, stay
+``PENDING`` until someone verifies them. The sweep pages through Paystack's
+transaction list for the window covering the oldest pending payment,
+instead of verifying references one at a time, and settles every matching
+pending payment page by page: one transaction per page, pages processed a
+few at a time.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.background import advisory_lock, db_session, register_periodic_task
+from app.config import get_settings
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_events import payment_events
+from app.services.payment_service import PaymentService, payment_status_event, paystack_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Advisory lock key so only one worker process runs the scheduled sweep
+PAYMENT_SWEEP_LOCK_KEY = 0x5A9C0002
+
+# Allowance for clock skew between us and Paystack when choosing the window
+WINDOW_SLACK = timedelta(minutes=5)
+
+
+class PendingPaymentSweeper:
+    """Service class for settling pending payments from the transaction list."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def oldest_pending(self, min_age: timedelta, lookback: timedelta) -> Optional[datetime]:
+        """Get the creation time of the oldest pending payment due for a sweep."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            select(func.min(Payment.created_at)).where(
+                Payment.status == PaymentStatus.PENDING,
+                Payment.created_at <= now - min_age,
+                Payment.created_at >= now - lookback,
+            )
+        )
+        return result.scalar_one_or_none()
+    
+    async def settle(self, transactions: list[dict], min_age: timedelta) -> dict[str, int]:
+        """
+        Settle the pending payments matching one page of Paystack transactions.
+        
+        Matching payments are locked with SKIP LOCKED, so any payment being
+        verified concurrently is left to that verification. Everything is
+        committed as one transaction.
+        
+        Args:
+            transactions: Transaction objects from the Paystack list API.
+            min_age: Payments younger than this are left alone.
+        
+        Returns:
+            Counts of matched, succeeded and failed payments.
+        """
+        by_reference = {
+            transaction["reference"]: transaction
+            for transaction in transactions
+            if transaction.get("reference") and transaction.get("status") in ("success", "failed")
+        }
+        counts = {"matched": 0, "succeeded": 0, "failed": 0}
+        if not by_reference:
+            return counts
+        
+        result = await self.db.execute(
+            select(Payment)
+            .where(
+                Payment.paystack_reference.in_(by_reference),
+                Payment.status == PaymentStatus.PENDING,
+                Payment.created_at <= datetime.now(timezone.utc) - min_age,
+            )
+            .with_for_update(skip_locked=True)
+            .execution_options(populate_existing=True)
+        )
+        payments = result.scalars().all()
+        
+        payment_service = PaymentService(self.db)
+        events = []
+        for payment in payments:
+            counts["matched"] += 1
+            outcome = await payment_service.apply_gateway_result(payment, by_reference[payment.paystack_reference])
+            counts["succeeded" if outcome else "failed"] += 1
+            events.append(payment_status_event(payment))
+        
+        await self.db.commit()
+        for event in events:
+            payment_events.publish(event["reference"], event)
+        return counts
+
+
+async def sweep_pending_payments(
+    min_age: Optional[timedelta] = None,
+    lookback: Optional[timedelta] = None,
+    page_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Settle pending payments from Paystack's transaction list.
+    
+    The first page gives the page count; the remaining pages are fetched
+    and settled ``concurrency`` at a time, each on its own session. A page
+    that fails is counted and left for the next sweep.
+    
+    Args:
+        min_age: Skip payments younger than this, which are likely still in checkout.
+        lookback: Ignore payments older than this.
+        page_size: Transactions per list request.
+        concurrency: Pages fetched and settled in parallel.
+    
+    Returns:
+        Summary of the run.
+    """
+    min_age = min_age or timedelta(seconds=settings.PAYMENT_SWEEP_MIN_AGE_SECONDS)
+    lookback = lookback or timedelta(hours=settings.PAYMENT_SWEEP_LOOKBACK_HOURS)
+    page_size = page_size or settings.PAYMENT_SWEEP_PAGE_SIZE
+    semaphore = asyncio.Semaphore(concurrency or settings.PAYMENT_SWEEP_CONCURRENCY)
+    started_at = datetime.now(timezone.utc)
+    summary: dict[str, Any] = {
+        "started_at": started_at.isoformat(),
+        "pages": 0,
+        "transactions": 0,
+        "matched": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "page_errors": 0,
+    }
+    
+    async with db_session() as db:
+        oldest = await PendingPaymentSweeper(db).oldest_pending(min_age, lookback)
+    if oldest is None:
+        summary["finished_at"] = datetime.now(timezone.utc).isoformat()
+        return summary
+    start, end = oldest - WINDOW_SLACK, started_at
+    
+    async def sweep_page(page: int) -> dict:
+        async with semaphore:
+            response = await paystack_client.list_transactions(start, end, page=page, per_page=page_size)
+            transactions = response.get("data") or []
+            async with db_session() as db:
+                counts = await PendingPaymentSweeper(db).settle(transactions, min_age)
+        summary["pages"] += 1
+        summary["transactions"] += len(transactions)
+        for key, value in counts.items():
+            summary[key] += value
+        return response.get("meta") or {}
+    
+    meta = await sweep_page(1)
+    page_count = int(meta.get("pageCount") or 1)
+    results = await asyncio.gather(
+        *(sweep_page(page) for page in range(2, page_count + 1)),
+        return_exceptions=True,
+    )
+    # A failed page is picked up again by the next sweep
+    for error in (result for result in results if isinstance(result, Exception)):
+        summary["page_errors"] += 1
+        logger.warning("Pending payment sweep page failed: %r", error)
+    
+    summary["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return summary
+
+
+async def _scheduled_sweep() -> None:
+    """Run the sweep from one worker process at a time."""
+    async with advisory_lock(PAYMENT_SWEEP_LOCK_KEY) as locked:
+        if not locked:
+            return
+        summary = await sweep_pending_payments()
+        logger.info("Pending payment sweep finished: %s", summary)
+
+
+register_periodic_task(
+    "pending-payment-sweep",
+    settings.PAYMENT_SWEEP_SECONDS,
+    _scheduled_sweep,
+)
@@ -0,0 +1,96 @@
+"""
+In-process cache of public user profiles.
+
+Profiles are read far more often than they change (share pages,
+leaderboards), so the serialized ``UserProfile`` JSON is kept per user with
+a strong ETag derived from ``updated_at``. ``UserService`` invalidates an
+entry whenever it changes the user; other processes pick the change up
+when their entry expires.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.user import User
+from app.schemas.user import UserProfile
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CachedProfile:
+    """Serialized public profile and its validator."""
+    
+    body: bytes
+    etag: str
+
+
+class ProfileCache:
+    """Bounded LRU/TTL cache of serialized public profiles."""
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache: TTLCache[CachedProfile] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+    
+    async def get(self, db: AsyncSession, user_id: UUID) -> Optional[CachedProfile]:
+        """
+        Get a user's public profile, loading it on a miss.
+        
+        Only the public columns are read. Returns None for unknown or
+        deleted users.
+        """
+        profile = self._cache.get(user_id)
+        if profile is not None:
+            return profile
+        
+        result = await db.execute(
+            select(
+                User.id,
+                User.first_name,
+                User.last_name,
+                User.avatar_url,
+                User.job_title,
+                User.company,
+                User.industry,
+                User.bio,
+                User.updated_at,
+            ).where(User.id == user_id, User.deleted_at.is_(None))
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        
+        body = UserProfile(
+            id=row.id,
+            full_name=f"{row.first_name} {row.last_name}",
+            avatar_url=row.avatar_url,
+            job_title=row.job_title,
+            company=row.company,
+            industry=row.industry,
+            bio=row.bio,
+        ).model_dump_json().encode()
+        # Every profile change bumps updated_at, so it identifies the content
+        profile = CachedProfile(body=body, etag=f'"{row.id.hex[:8]}-{int(row.updated_at.timestamp() * 1_000_000):x}"')
+        self._cache.set(user_id, profile)
+        return profile
+    
+    def invalidate(self, user_id: UUID) -> None:
+        """Drop a user's cached profile after it changed."""
+        self._cache.delete(user_id)
+    
+    def stats(self) -> dict[str, Any]:
+        """Get cache counters."""
+        return self._cache.stats()
+
+
+profile_cache = ProfileCache(
+    max_size=settings.PROFILE_CACHE_SIZE,
+    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+register_stats("profile_cache", profile_cache.stats)
@@ -0,0 +1,222 @@
+"""
+Ledger reconciliation service.
+
+Checks each credit account's balance and lifetime totals against the sum of
+its completed ledger entries. Aggregation runs in PostgreSQL and only
+drifted accounts are streamed back through a server-side cursor, so the job
+runs in constant memory however large ``credit_transactions`` grows.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import Text, and_, case, cast, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.background import advisory_lock, db_session, register_periodic_task
+from app.config import get_settings
+from app.models.credit import Credit, CreditTransaction, TransactionStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Advisory lock key so only one worker process runs the scheduled job
+RECONCILIATION_LOCK_KEY = 0x5A9C0001
+
+
+def _shard_of(column: Any, shards: int) -> Any:
+    """SQL expression assigning a row to one of ``shards`` buckets."""
+    return func.abs(func.hashtext(cast(column, Text)) % shards)
+
+
+class LedgerReconciliationService:
+    """Service class for verifying credit balances against the ledger."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def _drift_query(self, shard: int, shards: int):
+        """Build the query returning accounts whose totals disagree with the ledger."""
+        ledger = select(
+            CreditTransaction.credit_id,
+            func.sum(CreditTransaction.amount).label("balance"),
+            func.sum(case((CreditTransaction.amount > 0, CreditTransaction.amount), else_=0)).label("earned"),
+            func.sum(case((CreditTransaction.amount < 0, -CreditTransaction.amount), else_=0)).label("used"),
+            func.count().label("entries"),
+        ).where(CreditTransaction.status == TransactionStatus.COMPLETED)
+        credits = select(Credit.id, Credit.user_id, Credit.balance, Credit.lifetime_earned, Credit.lifetime_used)
+        if shards > 1:
+            ledger = ledger.where(_shard_of(CreditTransaction.credit_id, shards) == shard)
+            credits = credits.where(_shard_of(Credit.id, shards) == shard)
+        ledger = ledger.group_by(CreditTransaction.credit_id).subquery("ledger")
+        credits = credits.subquery("account")
+        
+        expected_balance = func.coalesce(ledger.c.balance, 0)
+        expected_earned = func.coalesce(ledger.c.earned, 0)
+        expected_used = func.coalesce(ledger.c.used, 0)
+        return (
+            select(
+                credits.c.id.label("credit_id"),
+                credits.c.user_id,
+                credits.c.balance,
+                credits.c.lifetime_earned,
+                credits.c.lifetime_used,
+                expected_balance.label("expected_balance"),
+                expected_earned.label("expected_earned"),
+                expected_used.label("expected_used"),
+                func.coalesce(ledger.c.entries, 0).label("entries"),
+            )
+            .select_from(credits.outerjoin(ledger, ledger.c.credit_id == credits.c.id))
+            .where(
+                or_(
+                    credits.c.balance != expected_balance,
+                    credits.c.lifetime_earned != expected_earned,
+                    credits.c.lifetime_used != expected_used,
+                )
+            )
+            .order_by(credits.c.id)
+        )
+    
+    async def stream_drift(
+        self,
+        shard: int = 0,
+        shards: int = 1,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Stream drifted accounts for one shard.
+        
+        Args:
+            shard: Shard to check, from 0 to ``shards - 1``.
+            shards: Total number of shards the accounts are split into.
+            batch_size: Rows fetched per round trip from the server-side cursor.
+        
+        Yields:
+            One JSON-serializable drift record per drifted account.
+        """
+        result = await self.db.stream(
+            self._drift_query(shard, shards).execution_options(yield_per=batch_size)
+        )
+        async for row in result.mappings():
+            yield {
+                "credit_id": str(row["credit_id"]),
+                "user_id": str(row["user_id"]),
+                "balance": row["balance"],
+                "expected_balance": row["expected_balance"],
+                "lifetime_earned": row["lifetime_earned"],
+                "expected_earned": row["expected_earned"],
+                "lifetime_used": row["lifetime_used"],
+                "expected_used": row["expected_used"],
+                "ledger_entries": row["entries"],
+            }
+    
+    async def repair(self, drift: dict[str, Any]) -> bool:
+        """
+        Set an account's totals to the ledger's, unless it changed since it was read.
+        
+        Args:
+            drift: A record produced by ``stream_drift``.
+        
+        Returns:
+            True if the account was updated.
+        """
+        result = await self.db.execute(
+            update(Credit)
+            .where(
+                and_(
+                    Credit.id == UUID(drift["credit_id"]),
+                    Credit.balance == drift["balance"],
+                    Credit.lifetime_earned == drift["lifetime_earned"],
+                    Credit.lifetime_used == drift["lifetime_used"],
+                )
+            )
+            .values(
+                balance=drift["expected_balance"],
+                lifetime_earned=drift["expected_earned"],
+                lifetime_used=drift["expected_used"],
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+
+async def reconcile_ledger(
+    shards: int = 1,
+    concurrency: Optional[int] = None,
+    repair: bool = False,
+    batch_size: int = 1000,
+    on_drift: Optional[Callable[[dict[str, Any]], Awaitable[None]]] = None,
+) -> dict[str, Any]:
+    """
+    Reconcile every credit account against the ledger.
+    
+    Each shard is checked on its own database session, ``concurrency``
+    shards at a time. Repairs go through a second session per shard so the
+    streaming cursor stays open.
+    
+    Args:
+        shards: Number of shards to split the accounts into.
+        concurrency: Shards checked in parallel (defaults to all of them).
+        repair: Whether to correct drifted accounts.
+        batch_size: Rows fetched per round trip from each cursor.
+        on_drift: Called with each drift record, e.g. to write a report.
+    
+    Returns:
+        Summary of the run.
+    """
+    semaphore = asyncio.Semaphore(concurrency or shards)
+    started_at = datetime.now(timezone.utc)
+    
+    async def check_shard(shard: int) -> tuple[int, int]:
+        drifted = repaired = 0
+        async with semaphore, db_session() as reader, db_session() as writer:
+            checker = LedgerReconciliationService(reader)
+            fixer = LedgerReconciliationService(writer)
+            async for drift in checker.stream_drift(shard, shards, batch_size):
+                drifted += 1
+                if repair:
+                    drift["repaired"] = await fixer.repair(drift)
+                    repaired += drift["repaired"]
+                if on_drift is not None:
+                    await on_drift(drift)
+        return drifted, repaired
+    
+    results = await asyncio.gather(*(check_shard(shard) for shard in range(shards)))
+    
+    return {
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "shards": shards,
+        "repair": repair,
+        "drifted": sum(drifted for drifted, _ in results),
+        "repaired": sum(repaired for _, repaired in results),
+    }
+
+
+async def _scheduled_reconciliation() -> None:
+    """Run reconciliation from one worker process at a time."""
+    async with advisory_lock(RECONCILIATION_LOCK_KEY) as locked:
+        if not locked:
+            return
+        
+        async def log_drift(drift: dict[str, Any]) -> None:
+            logger.warning("Ledger drift: %s", drift)
+        
+        summary = await reconcile_ledger(
+            shards=settings.LEDGER_RECONCILIATION_SHARDS,
+            repair=settings.LEDGER_RECONCILIATION_REPAIR,
+            on_drift=log_drift,
+        )
+        logger.info("Ledger reconciliation finished: %s", summary)
+
+
+register_periodic_task(
+    "ledger-reconciliation",
+    settings.LEDGER_RECONCILIATION_SECONDS,
+    _scheduled_reconciliation,
+)
@@ -2,17 +2,37 @@
 User service for handling user-related operations.
 """
 
-from datetime import datetime, timezone
-from typing import Optional
-from uuid import UUID
+from typing import Any, Optional
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.auth.password import hash_password, verify_password
-from app.models.credit import Credit
-from app.models.user import User
+from app.auth.password import (
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
+)
+from app.auth.principal_cache import principal_cache
+from app.auth.revocation import revocation_store
+from app.config import get_settings
+from app.exceptions import ServiceBusyException
+from app.models.credit import Credit, CreditTransaction
+from app.models.interview import Interview
+from app.models.payment import Payment
+from app.models.presentation import Presentation
+from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.last_login import last_login_buffer
+from app.services.profile_cache import profile_cache
+
+settings = get_settings()
+
+# PostgreSQL SQLSTATE for unique constraint violations
+UNIQUE_VIOLATION = "23505"
 
 
 class UserService:
@@ -23,9 +43,26 @@ class UserService:
     
     async def get_by_id(self, user_id: UUID) -> Optional[User]:
         """Get user by ID."""
-        result = await self.db.execute(select(User).where(User.id == user_id))
+        # Always refresh from the database so a cached principal merged into
+        # this session never masks the stored row.
+        result = await self.db.execute(
+            select(User)
+            .where(User.id == user_id)
+            .execution_options(populate_existing=True)
+        )
         return result.scalar_one_or_none()
     
+    async def get_for_principal(self, user_id: UUID, issued_at: Optional[int]) -> Optional[User]:
+        """Get the user behind an access token, using the principal cache."""
+        user = await principal_cache.get(self.db, user_id, issued_at)
+        if user is not None:
+            return user
+        
+        user = await self.get_by_id(user_id)
+        if user is not None:
+            principal_cache.set(user_id, issued_at, user)
+        return user
+    
     async def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email."""
         result = await self.db.execute(select(User).where(User.email == email))
@@ -34,7 +71,7 @@ class UserService:
     async def create(self, user_data: UserCreate) -> User:
         """Create a new user."""
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Create user
         user = User(
@@ -51,15 +88,99 @@ class UserService:
         
         return user
     
+    async def register(self, user_data: UserCreate, initial_balance: int = 0) -> Optional[User]:
+        """
+        Create a user and their credit account in a single statement.
+        
+        Both rows are inserted by one ``INSERT ... RETURNING`` round trip in
+        one transaction. Duplicate emails are detected by the unique
+        constraint rather than a separate lookup.
+        
+        Args:
+            user_data: The registration details.
+            initial_balance: Starting credit balance.
+        
+        Returns:
+            The new User with its credits loaded, or None if the email is taken.
+        """
+        hashed_password = await hash_password_async(user_data.password)
+        
+        new_user = (
+            insert(User)
+            .values(
+                id=uuid4(),
+                email=user_data.email,
+                hashed_password=hashed_password,
+                first_name=user_data.first_name,
+                last_name=user_data.last_name,
+                phone_number=user_data.phone_number,
+                # Python-side column defaults are not applied inside a CTE
+                is_active=True,
+                is_verified=False,
+                role=UserRole.USER,
+                token_version=0,
+            )
+            .returning(*User.__table__.c)
+            .cte("new_user")
+        )
+        new_credit = (
+            insert(Credit)
+            .from_select(
+                ["id", "user_id", "balance", "lifetime_earned", "lifetime_used"],
+                select(
+                    literal(uuid4(), Credit.id.type),
+                    new_user.c.id,
+                    literal(initial_balance),
+                    literal(initial_balance),
+                    literal(0),
+                ),
+            )
+            .returning(*Credit.__table__.c)
+            .cte("new_credit")
+        )
+        stmt = select(
+            *new_user.c,
+            *(column.label(f"credit_{column.name}") for column in new_credit.c),
+        ).select_from(new_user.join(new_credit, new_credit.c.user_id == new_user.c.id))
+        
+        try:
+            row = (await self.db.execute(stmt)).mappings().one()
+            await self.db.commit()
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if getattr(exc.orig, "pgcode", None) == UNIQUE_VIOLATION:
+                return None
+            raise
+        
+        # Attach the returned rows without reloading them
+        user = User(**{column.name: row[column.name] for column in User.__table__.c})
+        credit = Credit(**{column.name: row[f"credit_{column.name}"] for column in Credit.__table__.c})
+        make_transient_to_detached(user)
+        make_transient_to_detached(credit)
+        user = await self.db.merge(user, load=False)
+        credit = await self.db.merge(credit, load=False)
+        set_committed_value(user, "credits", credit)
+        
+        return user
+    
     async def authenticate(self, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password."""
         user = await self.get_by_email(email)
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         
+        # Rehash when the stored bcrypt cost is outside the accepted range
+        if password_needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await hash_password_async(password)
+                await self.db.commit()
+            except ServiceBusyException:
+                # Rehashing is opportunistic; retry on a later login
+                pass
+        
         return user
     
     async def update(self, user_id: UUID, update_data: UserUpdate) -> Optional[User]:
@@ -75,24 +196,38 @@ class UserService:
         
         await self.db.commit()
         await self.db.refresh(user)
+        # Callers serialize credit_balance, which cannot lazy-load under asyncio
+        await self.db.refresh(user, ["credits"])
+        principal_cache.invalidate(user_id)
+        profile_cache.invalidate(user_id)
         
         return user
     
     async def update_last_login(self, user_id: UUID) -> None:
-        """Update user's last login time."""
-        user = await self.get_by_id(user_id)
-        if user:
-            user.last_login = datetime.now(timezone.utc)
-            await self.db.commit()
+        """
+        Update user's last login time.
+        
+        The time is buffered and written by the next periodic flush.
+        """
+        last_login_buffer.record(user_id)
     
     async def update_password(self, user_id: UUID, new_password: str) -> bool:
-        """Update user's password."""
+        """
+        Update user's password.
+        
+        Bumps the token version, so access tokens issued before the change
+        are rejected.
+        """
         user = await self.get_by_id(user_id)
         if not user:
             return False
         
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = await hash_password_async(new_password)
+        user.token_version += 1
+        await revocation_store.revoke_token_version(self.db, user_id, user.token_version)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
+        principal_cache.set_min_token_version(user_id, user.token_version)
         return True
     
     async def verify_password(self, user_id: UUID, password: str) -> bool:
@@ -101,7 +236,7 @@ class UserService:
         if not user:
             return False
         
-        return verify_password(password, user.hashed_password)
+        return await verify_password_async(password, user.hashed_password)
     
     async def initialize_credits(self, user_id: UUID, initial_balance: int = 0) -> Credit:
         """Initialize credits for a new user."""
@@ -125,15 +260,63 @@ class UserService:
             return False
         
         user.is_active = False
+        user.token_version += 1
+        await revocation_store.revoke_token_version(self.db, user_id, user.token_version)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
+        principal_cache.set_min_token_version(user_id, user.token_version)
         return True
     
+    async def _dependent_rows(self, user_id: UUID, limit: int) -> int:
+        """Count the user's dependent rows, counting each table only up to ``limit``."""
+        def capped(model) -> Any:
+            rows = select(literal(1)).where(model.user_id == user_id).limit(limit).subquery()
+            return select(func.count()).select_from(rows).scalar_subquery()
+        
+        result = await self.db.execute(
+            select(capped(CreditTransaction) + capped(Payment) + capped(Interview) + capped(Presentation))
+        )
+        return result.scalar_one()
+    
     async def delete(self, user_id: UUID) -> bool:
-        """Delete a user account."""
-        user = await self.get_by_id(user_id)
-        if not user:
+        """
+        Delete a user account.
+        
+        Dependent rows are removed by the ``ON DELETE CASCADE`` foreign keys
+        in one statement, without loading them. Accounts with more than
+        ``USER_DELETE_SYNC_MAX_ROWS`` dependent rows are deactivated at once
+        and left to the background purge (see ``account_purge``); their email
+        is replaced by a tombstone so the address can register again meanwhile.
+        """
+        result = await self.db.execute(
+            select(User.token_version).where(User.id == user_id, User.deleted_at.is_(None))
+        )
+        token_version = result.scalar_one_or_none()
+        if token_version is None:
             return False
         
-        await self.db.delete(user)
+        limit = settings.USER_DELETE_SYNC_MAX_ROWS
+        if await self._dependent_rows(user_id, limit) >= limit:
+            await self.db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    email=f"deleted+{user_id}@deleted.invalid",
+                    is_active=False,
+                    deleted_at=func.now(),
+                    token_version=User.token_version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            await self.db.execute(
+                delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+            )
+        await revocation_store.revoke_token_version(self.db, user_id, token_version + 1)
         await self.db.commit()
+        
+        # Reject tokens already issued to the account
+        principal_cache.invalidate(user_id)
+        profile_cache.invalidate(user_id)
+        principal_cache.set_min_token_version(user_id, token_version + 1)
         return True
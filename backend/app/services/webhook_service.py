@@ -0,0 +1,278 @@
+"""
+Webhook inbox and background processing.
+
+Verified webhook deliveries are stored in ``webhook_events`` and
+acknowledged immediately. A pool of workers in each process claims due
+events one at a time with ``FOR UPDATE SKIP LOCKED``, processes them and
+retries failures with backoff, so slow provider calls never hold up the
+webhook request.
+"""
+
+import asyncio
+import hashlib
+import logging
+import random
+from datetime import timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.background import db_session
+from app.config import get_settings
+from app.metrics import register_stats
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.services.payment_service import PaymentService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def webhook_event_key(provider: str, payload: dict, body: bytes) -> str:
+    """
+    Build the deduplication key for a webhook delivery.
+    
+    Redeliveries of the same event share the event type and the provider's
+    object ID or reference; anything else falls back to a hash of the body.
+    """
+    data = payload.get("data")
+    object_key = (data.get("id") or data.get("reference")) if isinstance(data, dict) else None
+    if object_key is None:
+        object_key = hashlib.sha256(body).hexdigest()
+    return f"{provider}:{payload.get('event')}:{object_key}"
+
+
+class WebhookInboxService:
+    """Service class for webhook inbox operations."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def enqueue(self, provider: str, event_key: str, payload: dict) -> bool:
+        """
+        Store a webhook event for processing.
+        
+        Args:
+            provider: Name of the sending provider.
+            event_key: Deduplication key from ``webhook_event_key``.
+            payload: The parsed webhook body.
+        
+        Returns:
+            True if the event is new, False if it was already received.
+        """
+        result = await self.db.execute(
+            insert(WebhookEvent)
+            .values(
+                provider=provider,
+                event_key=event_key,
+                event_type=str(payload.get("event") or "unknown")[:100],
+                payload=payload,
+                status=WebhookEventStatus.PENDING,
+                attempts=0,
+            )
+            .on_conflict_do_nothing(index_elements=[WebhookEvent.event_key])
+            .returning(WebhookEvent.id)
+        )
+        created = result.scalar_one_or_none() is not None
+        await self.db.commit()
+        return created
+    
+    async def claim(self, lease_seconds: float) -> Optional[tuple[UUID, dict, int]]:
+        """
+        Claim the next due event for processing.
+        
+        The claimed event is leased: if the worker dies, it becomes due again
+        once the lease runs out. Claiming one event at a time starts each
+        lease when its processing starts, so events never wait out their
+        lease behind others.
+        
+        Returns:
+            (event ID, payload, attempt number), or None if nothing is due.
+        """
+        due = (
+            select(WebhookEvent.id)
+            .where(
+                WebhookEvent.status.in_([WebhookEventStatus.PENDING, WebhookEventStatus.PROCESSING]),
+                WebhookEvent.next_attempt_at <= func.now(),
+            )
+            .order_by(WebhookEvent.next_attempt_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(due))
+            .values(
+                status=WebhookEventStatus.PROCESSING,
+                attempts=WebhookEvent.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds),
+                updated_at=func.now(),
+            )
+            .returning(WebhookEvent.id, WebhookEvent.payload, WebhookEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        await self.db.commit()
+        return tuple(row) if row is not None else None
+    
+    async def mark_processed(self, event_id: UUID, attempt: int) -> None:
+        """
+        Record that an event was handled.
+        
+        Ignored if the event was claimed again after this attempt's lease ran out.
+        """
+        await self.db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id, WebhookEvent.attempts == attempt)
+            .values(
+                status=WebhookEventStatus.PROCESSED,
+                processed_at=func.now(),
+                last_error=None,
+                updated_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+    
+    async def mark_failed(self, event_id: UUID, attempt: int, error: str, retry_in: Optional[float]) -> None:
+        """
+        Record a processing failure.
+        
+        Ignored if the event was claimed again after this attempt's lease ran out.
+        
+        Args:
+            event_id: The event's ID.
+            attempt: The attempt number the event was claimed with.
+            error: Description of the failure.
+            retry_in: Seconds until the next attempt, or None to give up.
+        """
+        if retry_in is None:
+            values = {"status": WebhookEventStatus.FAILED}
+        else:
+            values = {
+                "status": WebhookEventStatus.PENDING,
+                "next_attempt_at": func.now() + timedelta(seconds=retry_in),
+            }
+        await self.db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id, WebhookEvent.attempts == attempt)
+            .values(last_error=error[:2000], updated_at=func.now(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+
+async def _handle_paystack_event(payload: dict) -> None:
+    async with db_session() as db:
+        await PaymentService(db).handle_webhook(payload)
+
+
+class WebhookProcessor:
+    """Pool of workers draining the webhook inbox."""
+    
+    def __init__(
+        self,
+        workers: int,
+        poll_seconds: float,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        lease_seconds: float,
+    ):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+    
+    def notify(self) -> None:
+        """Wake idle workers, e.g. after enqueueing an event."""
+        self._wakeup.set()
+    
+    def _retry_delay(self, attempt: int) -> float:
+        # Exponential backoff with jitter, capped at an hour
+        delay = min(self.retry_backoff_seconds * (2 ** (attempt - 1)), 3600)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    async def _process(self, event_id: UUID, payload: dict, attempt: int) -> None:
+        try:
+            await _handle_paystack_event(payload)
+        except Exception as exc:
+            give_up = attempt >= self.max_attempts
+            if give_up:
+                self.failed += 1
+                logger.exception("Webhook event %s failed permanently after %d attempts", event_id, attempt)
+            else:
+                self.retried += 1
+                logger.warning("Webhook event %s failed (attempt %d): %s", event_id, attempt, exc)
+            async with db_session() as db:
+                await WebhookInboxService(db).mark_failed(
+                    event_id, attempt, repr(exc), None if give_up else self._retry_delay(attempt)
+                )
+            return
+        
+        async with db_session() as db:
+            await WebhookInboxService(db).mark_processed(event_id, attempt)
+        self.processed += 1
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with db_session() as db:
+                    claimed = await WebhookInboxService(db).claim(self.lease_seconds)
+                if claimed is not None:
+                    await self._process(*claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Webhook worker error")
+                claimed = None
+            
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+    
+    def start(self) -> None:
+        """Start the worker tasks."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"webhook-worker-{index}")
+            for index in range(self.workers)
+        ]
+    
+    async def stop(self) -> None:
+        """Cancel the worker tasks; events being processed are retried after their lease."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def stats(self) -> dict[str, Any]:
+        """Get processing counters."""
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+webhook_processor = WebhookProcessor(
+    workers=settings.WEBHOOK_WORKERS,
+    poll_seconds=settings.WEBHOOK_POLL_SECONDS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    retry_backoff_seconds=settings.WEBHOOK_RETRY_BACKOFF_SECONDS,
+    lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+)
+register_stats("webhooks", webhook_processor.stats)
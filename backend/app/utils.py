@@ -2,6 +2,7 @@
 Utility functions for Saphire AI.
 """
 
+import base64
 import json
 import uuid
 from datetime import datetime, timezone
@@ -40,6 +41,47 @@ def from_json(json_string: str) -> Any:
     return json.loads(json_string)
 
 
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Encode a ``(created_at, id)`` keyset position as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+    
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an ``If-None-Match`` header value against an entity tag."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def sse_message(data: Any = None, event: Optional[str] = None) -> str:
+    """
+    Format a Server-Sent Events message.
+    
+    With no data, returns a comment line that only keeps the connection alive.
+    """
+    if data is None:
+        return ": keepalive\n\n"
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
 def generate_paystack_reference() -> str:
     """Generate a unique Paystack transaction reference."""
     return f"saphire_{uuid.uuid4().hex[:20]}"
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark for JWT encode/decode throughput.
+
+Compares passing raw key material to python-jose on every call (the old
+path, which re-parses the key each time) against passing pre-parsed key
+objects, for both HS256 and RS256.
+
+Usage:
+    python -m scripts.benchmark_jwt [--iterations 2000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+def _claims() -> dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {
+        "sub": "6f1c2f8e-3d4b-4a8e-9d3e-1f2a3b4c5d6e",
+        "type": "access",
+        "iat": now,
+        "exp": now + timedelta(minutes=30),
+        "cv": 1,
+        "role": "user",
+        "act": True,
+        "vfd": True,
+        "tv": 0,
+    }
+
+
+def _rate(func: Callable[[], Any], iterations: int) -> float:
+    """Run a function repeatedly and return calls per second."""
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - started_at)
+
+
+def _report(name: str, encode_rate: float, decode_rate: float) -> None:
+    print(f"{name:<28} encode {encode_rate:>10,.0f}/s   decode {decode_rate:>10,.0f}/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    n = args.iterations
+    claims = _claims()
+    
+    # HS256
+    secret = "benchmark-secret-key-of-reasonable-length"
+    hs_key = jwk.construct(secret, "HS256")
+    token = jwt.encode(claims, secret, algorithm="HS256")
+    _report(
+        "HS256 raw secret (old)",
+        _rate(lambda: jwt.encode(claims, secret, algorithm="HS256"), n),
+        _rate(lambda: jwt.decode(token, secret, algorithms=["HS256"]), n),
+    )
+    _report(
+        "HS256 cached key",
+        _rate(lambda: jwt.encode(claims, hs_key, algorithm="HS256"), n),
+        _rate(lambda: jwt.decode(token, hs_key, algorithms=["HS256"]), n),
+    )
+    
+    # RS256
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    rs_signing_key = jwk.construct(private_pem, "RS256")
+    rs_verify_key = rs_signing_key.public_key()
+    token = jwt.encode(claims, private_pem, algorithm="RS256")
+    rs_iterations = max(1, n // 10)
+    _report(
+        "RS256 raw PEM",
+        _rate(lambda: jwt.encode(claims, private_pem, algorithm="RS256"), rs_iterations),
+        _rate(lambda: jwt.decode(token, public_pem, algorithms=["RS256"]), rs_iterations),
+    )
+    _report(
+        "RS256 cached key",
+        _rate(lambda: jwt.encode(claims, rs_signing_key, algorithm="RS256"), rs_iterations),
+        _rate(lambda: jwt.decode(token, rs_verify_key, algorithms=["RS256"]), n),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Calibrate the bcrypt cost once for a deployment.
+
+Prints a ``BCRYPT_ROUNDS`` line to set for every worker, so they all hash
+with the same cost instead of calibrating separately at startup. Run it
+on the production instance type.
+
+Usage:
+    python -m scripts.calibrate_bcrypt [--target-ms 150] [--samples 5]
+"""
+
+import argparse
+
+from app.auth.password import calibrate_bcrypt_rounds
+from app.config import get_settings
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=settings.BCRYPT_TARGET_MS)
+    parser.add_argument("--min-rounds", type=int, default=settings.BCRYPT_MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=settings.BCRYPT_MAX_ROUNDS)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+    
+    rounds = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds, samples=args.samples)
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
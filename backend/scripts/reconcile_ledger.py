@@ -0,0 +1,55 @@
+"""
+Reconcile credit balances against the credit transaction ledger.
+
+Writes one JSON object per drifted account (JSON Lines) to the output, then
+a final ``{"summary": ...}`` line. Exits with status 1 if any drift was
+found, so it can gate a cron job or CI check.
+
+Usage:
+    python -m scripts.reconcile_ledger [--shards 4] [--concurrency 4] [--repair] [--output drift.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, TextIO
+
+from app.services.reconciliation_service import reconcile_ledger
+
+
+async def run(args: argparse.Namespace, output: TextIO) -> dict[str, Any]:
+    async def write_drift(drift: dict[str, Any]) -> None:
+        output.write(json.dumps(drift) + "\n")
+    
+    summary = await reconcile_ledger(
+        shards=args.shards,
+        concurrency=args.concurrency,
+        repair=args.repair,
+        batch_size=args.batch_size,
+        on_drift=write_drift,
+    )
+    output.write(json.dumps({"summary": summary}) + "\n")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=None, help="Shards checked in parallel (default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repair", action="store_true", help="Set drifted accounts to the ledger totals")
+    parser.add_argument("--output", default="-", help="Report path (default: stdout)")
+    args = parser.parse_args()
+    
+    if args.output == "-":
+        summary = asyncio.run(run(args, sys.stdout))
+    else:
+        with open(args.output, "w") as output:
+            summary = asyncio.run(run(args, output))
+    
+    sys.exit(1 if summary["drifted"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Shared test configuration.
+
+Tests that use the ``db`` fixture need PostgreSQL. Point TEST_DATABASE_URL
+at a disposable database (its tables are dropped and recreated) or they are
+skipped. Provider credentials are replaced with test values so no test can
+reach a real service.
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+os.environ.update(
+    DATABASE_URL=TEST_DATABASE_URL or "postgresql+asyncpg://localhost/saphire_test_unused",
+    DATABASE_READ_URL="",
+    SECRET_KEY="test-secret-key",
+    OPENAI_API_KEY="test",
+    SUPABASE_URL="https://test.supabase.co",
+    SUPABASE_ANON_KEY="test",
+    SUPABASE_SERVICE_ROLE_KEY="test",
+    PAYSTACK_SECRET_KEY="sk_test_fake",
+    RESEND_API_KEY="test",
+    ELEVENLABS_API_KEY="test",
+    BCRYPT_TARGET_MS="0",
+)
+
+
+@pytest.fixture(scope="session")
+def _schema() -> None:
+    """Create every table once per test run."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    
+    import app.models  # noqa: F401  (registers every table)
+    from app.database import Base, primary_database
+    
+    async def create() -> None:
+        async with primary_database.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+        await primary_database.dispose()
+    
+    asyncio.run(create())
+
+
+@pytest_asyncio.fixture
+async def db(_schema: None) -> AsyncIterator[None]:
+    """Use the test database; pooled connections are closed after each test."""
+    from app.database import primary_database
+    
+    yield
+    await primary_database.dispose()
+
+
+@pytest_asyncio.fixture
+async def make_user(db: None) -> AsyncIterator[Callable[..., Awaitable[UUID]]]:
+    """Factory creating throwaway users, optionally with a credit balance; deleted afterwards."""
+    from sqlalchemy import delete
+    
+    from app.background import db_session
+    from app.models.credit import Credit
+    from app.models.user import User
+    
+    created: list[UUID] = []
+    
+    async def create(balance: int | None = None) -> UUID:
+        async with db_session() as session:
+            user = User(
+                email=f"test-{uuid4().hex}@example.com",
+                hashed_password="!",
+                first_name="Test",
+                last_name="User",
+            )
+            session.add(user)
+            await session.flush()
+            if balance is not None:
+                session.add(Credit(user_id=user.id, balance=balance, lifetime_earned=balance, lifetime_used=0))
+            await session.commit()
+            created.append(user.id)
+            return user.id
+    
+    yield create
+    
+    async with db_session() as session:
+        await session.execute(delete(User).where(User.id.in_(created)))
+        await session.commit()
@@ -0,0 +1,111 @@
+"""
+Local stand-in for the Paystack API.
+
+Serves Paystack's endpoints from a real HTTP server on an ephemeral
+localhost port, answers after a configurable delay and counts calls, so
+tests can assert how often the gateway was reached.
+"""
+
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from app.http_clients import http_clients
+from app.services.payment_service import PaystackClient, paystack_client
+
+
+class _Server(uvicorn.Server):
+    def install_signal_handlers(self) -> None:
+        # The test runner owns signal handling
+        pass
+
+
+class FakePaystack:
+    """Paystack transactions held in memory."""
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.transactions: dict[str, dict] = {}
+        self.verify_calls: list[str] = []
+        self.verify_errors = 0  # Upcoming verify calls answered with a 500
+        self.list_calls = 0
+        self.active_lists = 0
+        self.max_active_lists = 0
+        self.app = FastAPI()
+        self.app.get("/transaction/verify/{reference}")(self._verify)
+        self.app.get("/transaction")(self._list)
+    
+    def add_transaction(self, reference: str, status: str = "success") -> dict:
+        """Record a transaction the fake gateway knows about."""
+        transaction = {
+            "id": 10_000_000 + len(self.transactions),
+            "reference": reference,
+            "status": status,
+            "channel": "card",
+        }
+        self.transactions[reference] = transaction
+        return transaction
+    
+    async def _verify(self, reference: str) -> JSONResponse:
+        self.verify_calls.append(reference)
+        await asyncio.sleep(self.latency)
+        if self.verify_errors > 0:
+            self.verify_errors -= 1
+            return JSONResponse({"status": False, "message": "Internal server error"}, status_code=500)
+        transaction = self.transactions.get(reference)
+        if transaction is None:
+            return JSONResponse({"status": False, "message": "Transaction reference not found"}, status_code=400)
+        return JSONResponse({"status": True, "message": "Verification successful", "data": transaction})
+    
+    async def _list(self, page: int = 1, per_page: int = Query(50, alias="perPage")) -> JSONResponse:
+        self.list_calls += 1
+        self.active_lists += 1
+        self.max_active_lists = max(self.max_active_lists, self.active_lists)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active_lists -= 1
+        
+        transactions = list(self.transactions.values())
+        return JSONResponse({
+            "status": True,
+            "message": "Transactions retrieved",
+            "data": transactions[(page - 1) * per_page:page * per_page],
+            "meta": {
+                "total": len(transactions),
+                "page": page,
+                "perPage": per_page,
+                "pageCount": math.ceil(len(transactions) / per_page),
+            },
+        })
+    
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator[str]:
+        """Run the server and point the Paystack client at it; yields the base URL."""
+        server = _Server(uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+        
+        await http_clients.aclose()
+        http_clients.register(PaystackClient.CLIENT_NAME, base_url=base_url, headers=paystack_client.headers)
+        try:
+            yield base_url
+        finally:
+            await http_clients.aclose()
+            http_clients.register(
+                PaystackClient.CLIENT_NAME,
+                base_url=PaystackClient.BASE_URL,
+                headers=paystack_client.headers,
+            )
+            server.should_exit = True
+            await task
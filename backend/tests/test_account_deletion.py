@@ -0,0 +1,34 @@
+"""
+Tests for account deletion.
+"""
+
+import pytest
+from sqlalchemy import select
+
+from app.background import db_session
+from app.config import get_settings
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_email_is_free_while_deletion_awaits_purge(make_user, monkeypatch):
+    # Every account is left to the background purge
+    monkeypatch.setattr(get_settings(), "USER_DELETE_SYNC_MAX_ROWS", 0)
+    user_id = await make_user()
+    async with db_session() as session:
+        email = (await session.execute(select(User.email).where(User.id == user_id))).scalar_one()
+        assert await UserService(session).delete(user_id)
+    
+    async with db_session() as session:
+        deleted = await UserService(session).get_by_id(user_id)
+        assert deleted.deleted_at is not None and deleted.email != email
+        
+        user = await UserService(session).register(
+            UserCreate(email=email, password="Str0ng-Passw0rd!", first_name="New", last_name="User")
+        )
+        assert user is not None and user.email == email
+        await session.delete(user)
+        await session.commit()
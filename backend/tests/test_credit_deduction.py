@@ -0,0 +1,88 @@
+"""
+Tests for atomic credit deduction.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+
+from app.background import db_session
+from app.models.credit import Credit, CreditTransaction, TransactionType
+from app.models.user import User
+from app.services.credit_service import CreditService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_deductions_never_overdraw(make_user):
+    balance, cost, workers = 100, 10, 100
+    user_id = await make_user(balance=balance)
+    start = asyncio.Event()
+    
+    async def deduct() -> bool:
+        async with db_session() as session:
+            await start.wait()
+            transaction = await CreditService(session).deduct_credits(
+                user_id=user_id,
+                amount=cost,
+                simulation_type="interview",
+                simulation_id=uuid4(),
+            )
+            return transaction is not None
+    
+    tasks = [asyncio.create_task(deduct()) for _ in range(workers)]
+    await asyncio.sleep(0)
+    start.set()
+    succeeded = sum(await asyncio.gather(*tasks))
+    
+    async with db_session() as session:
+        final_balance = (
+            await session.execute(select(Credit.balance).where(Credit.user_id == user_id))
+        ).scalar_one()
+        ledger_used = (
+            await session.execute(
+                select(func.coalesce(func.sum(-CreditTransaction.amount), 0)).where(
+                    CreditTransaction.user_id == user_id,
+                    CreditTransaction.type == TransactionType.USAGE,
+                )
+            )
+        ).scalar_one()
+    
+    assert final_balance >= 0
+    assert succeeded * cost == balance
+    assert final_balance == 0
+    assert ledger_used == balance
+
+
+async def test_insufficient_balance_keeps_pending_work(make_user):
+    user_id = await make_user(balance=5)
+    email = f"pending-{uuid4().hex}@example.com"
+    
+    async with db_session() as session:
+        # Work the caller added before the debit must survive a refused debit
+        pending = User(email=email, hashed_password="!", first_name="Pending", last_name="User")
+        session.add(pending)
+        
+        transaction = await CreditService(session).deduct_credits(
+            user_id=user_id,
+            amount=10,
+            simulation_type="interview",
+            simulation_id=uuid4(),
+        )
+        assert transaction is None
+        await session.commit()
+        pending_id = pending.id
+    
+    async with db_session() as session:
+        found = (await session.execute(select(User).where(User.email == email))).scalar_one_or_none()
+        balance = (
+            await session.execute(select(Credit.balance).where(Credit.user_id == user_id))
+        ).scalar_one()
+        if found is not None:
+            await session.delete(found)
+            await session.commit()
+    
+    assert found is not None and found.id == pending_id
+    assert balance == 5
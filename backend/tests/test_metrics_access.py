@@ -0,0 +1,51 @@
+"""
+Tests for access to the /metrics endpoint.
+"""
+
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.principal import principal_claims
+from app.config import get_settings
+from app.main import app
+from app.models.user import User, UserRole
+
+pytestmark = pytest.mark.asyncio
+
+
+def _token(role: UserRole) -> str:
+    user = User(id=uuid4(), role=role, is_active=True, is_verified=True, token_version=0)
+    return create_access_token(user.id, claims=principal_claims(user))
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    token = "scraper-token"
+    monkeypatch.setattr(get_settings(), "METRICS_TOKEN", token)
+    return token
+
+
+async def _get_metrics(token: str | None = None) -> int:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return (await client.get("/metrics", headers=headers)).status_code
+
+
+async def test_metrics_require_authentication():
+    assert await _get_metrics() == 401
+
+
+async def test_metrics_reject_non_admins():
+    assert await _get_metrics(_token(UserRole.USER)) == 403
+
+
+async def test_metrics_allow_admins():
+    assert await _get_metrics(_token(UserRole.ADMIN)) == 200
+
+
+async def test_metrics_allow_configured_token(metrics_token):
+    assert await _get_metrics(metrics_token) == 200
+    assert await _get_metrics("wrong-token") == 401
@@ -0,0 +1,112 @@
+"""
+Tests for the pending payment sweep.
+"""
+
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.background import db_session
+from app.models.credit import Credit, CreditTransaction, TransactionType
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_service import PaymentService
+from app.services.payment_sweep_service import sweep_pending_payments
+from tests.fake_paystack import FakePaystack
+
+pytestmark = pytest.mark.asyncio
+
+CREDITS = 10
+TRANSACTIONS = 3000
+PENDING = 1200
+PAGE_SIZE = 100
+CONCURRENCY = 4
+RACING_VERIFIES = 50
+
+
+@pytest_asyncio.fixture
+async def paystack(db):
+    fake = FakePaystack(latency=0.02)
+    async with fake.serve():
+        yield fake
+
+
+async def test_sweep_settles_pending_payments_once(make_user, paystack):
+    user_id = await make_user()
+    created_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    expected: dict[str, str] = {}
+    
+    for index in range(TRANSACTIONS):
+        reference = f"sweep_{uuid4().hex[:20]}"
+        status = random.choice(["success", "success", "failed", "abandoned"])
+        paystack.add_transaction(reference, status)
+        if index < PENDING:
+            expected[reference] = {"success": "SUCCESS", "failed": "FAILED"}.get(status, "PENDING")
+    # Pending payments Paystack has never heard of stay pending
+    for _ in range(PENDING // 10):
+        expected[f"sweep_{uuid4().hex[:20]}"] = "PENDING"
+    
+    async with db_session() as session:
+        for reference in expected:
+            session.add(
+                Payment(
+                    user_id=user_id,
+                    paystack_reference=reference,
+                    amount_kobo=100000,
+                    package_name="Test",
+                    credits_purchased=CREDITS,
+                    status=PaymentStatus.PENDING,
+                    customer_email="test@example.com",
+                    created_at=created_at,
+                )
+            )
+        await session.commit()
+    
+    # Client verifies racing the sweep for the same successful payments
+    racing = random.sample([ref for ref, status in expected.items() if status == "SUCCESS"], RACING_VERIFIES)
+    
+    async def verify(reference: str) -> bool:
+        async with db_session() as session:
+            success, _ = await PaymentService(session).verify_payment(reference)
+            return success
+    
+    summary, *verified = await asyncio.gather(
+        sweep_pending_payments(page_size=PAGE_SIZE, concurrency=CONCURRENCY),
+        *(verify(reference) for reference in racing),
+    )
+    
+    async with db_session() as session:
+        statuses = dict(
+            (
+                await session.execute(
+                    select(Payment.paystack_reference, Payment.status).where(Payment.user_id == user_id)
+                )
+            ).all()
+        )
+        grants = (
+            await session.execute(
+                select(func.count()).where(
+                    CreditTransaction.user_id == user_id,
+                    CreditTransaction.type == TransactionType.PURCHASE,
+                )
+            )
+        ).scalar_one()
+        balance = (
+            await session.execute(select(Credit.balance).where(Credit.user_id == user_id))
+        ).scalar_one()
+    
+    succeeded = sum(1 for status in expected.values() if status == "SUCCESS")
+    assert summary["page_errors"] == 0
+    assert all(verified)
+    assert {reference: status.name for reference, status in statuses.items()} == expected
+    assert grants == succeeded
+    assert balance == succeeded * CREDITS
+    # Paged through the list instead of verifying each reference
+    assert paystack.list_calls == math.ceil(TRANSACTIONS / PAGE_SIZE)
+    assert len(paystack.verify_calls) <= RACING_VERIFIES
+    assert paystack.max_active_lists <= CONCURRENCY
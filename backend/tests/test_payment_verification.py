@@ -0,0 +1,120 @@
+"""
+Tests for single-flight, row-locked payment verification.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID, uuid4
+
+import httpx
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.background import db_session
+from app.models.credit import Credit, CreditTransaction, TransactionType
+from app.models.payment import Payment, PaymentStatus
+from app.services.payment_service import PaymentService
+from app.services.payment_sweep_service import sweep_pending_payments
+from tests.fake_paystack import FakePaystack
+
+pytestmark = pytest.mark.asyncio
+
+CREDITS = 50
+WORKERS = 50
+
+
+@pytest_asyncio.fixture
+async def paystack(db):
+    fake = FakePaystack(latency=0.2)
+    async with fake.serve():
+        yield fake
+
+
+async def _create_payment(user_id: UUID, created_at: Optional[datetime] = None) -> str:
+    reference = f"test_{uuid4().hex[:20]}"
+    async with db_session() as session:
+        session.add(
+            Payment(
+                user_id=user_id,
+                paystack_reference=reference,
+                amount_kobo=100000,
+                package_name="Test",
+                credits_purchased=CREDITS,
+                status=PaymentStatus.PENDING,
+                customer_email="test@example.com",
+                created_at=created_at or datetime.now(timezone.utc),
+            )
+        )
+        await session.commit()
+    return reference
+
+
+async def _grants(user_id: UUID) -> tuple[int, int]:
+    """Return (purchase ledger entries, balance) for a user."""
+    async with db_session() as session:
+        grants = (
+            await session.execute(
+                select(func.count()).where(
+                    CreditTransaction.user_id == user_id,
+                    CreditTransaction.type == TransactionType.PURCHASE,
+                )
+            )
+        ).scalar_one()
+        balance = (
+            await session.execute(select(Credit.balance).where(Credit.user_id == user_id))
+        ).scalar_one_or_none()
+    return grants, balance or 0
+
+
+@pytest.mark.parametrize("coalesce", [True, False], ids=["coalesced", "row-locked"])
+async def test_concurrent_verifies_call_gateway_once(make_user, paystack, coalesce):
+    user_id = await make_user()
+    reference = await _create_payment(user_id)
+    paystack.add_transaction(reference, "success")
+    start = asyncio.Event()
+    
+    async def verify() -> bool:
+        async with db_session() as session:
+            await start.wait()
+            service = PaymentService(session)
+            if coalesce:
+                success, _ = await service.verify_payment(reference)
+                return success
+            # Separate sessions calling the locked path directly, as separate processes would
+            return await service._verify_locked(reference)
+    
+    tasks = [asyncio.create_task(verify()) for _ in range(WORKERS)]
+    await asyncio.sleep(0)
+    start.set()
+    results = await asyncio.gather(*tasks)
+    
+    grants, balance = await _grants(user_id)
+    assert all(results)
+    assert paystack.verify_calls == [reference]
+    assert grants == 1
+    assert balance == CREDITS
+
+
+async def test_gateway_error_leaves_payment_for_the_sweep(make_user, paystack):
+    user_id = await make_user()
+    reference = await _create_payment(user_id, created_at=datetime.now(timezone.utc) - timedelta(hours=1))
+    paystack.add_transaction(reference, "success")
+    paystack.verify_errors = 1
+    
+    async with db_session() as session:
+        with pytest.raises(httpx.HTTPStatusError):
+            await PaymentService(session)._verify_locked(reference)
+    
+    async with db_session() as session:
+        payment = await PaymentService(session).get_payment_by_reference(reference)
+    assert payment.status == PaymentStatus.PENDING
+    assert payment.failure_message
+    
+    summary = await sweep_pending_payments()
+    grants, balance = await _grants(user_id)
+    assert summary["page_errors"] == 0
+    assert grants == 1
+    assert balance == CREDITS
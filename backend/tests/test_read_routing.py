@@ -0,0 +1,75 @@
+"""
+Tests for read-your-writes routing across processes.
+"""
+
+import time
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Database, get_async_db, primary_database, track_user_writes
+from app.models.user import User
+from app.read_routing import (
+    LAST_WRITE_HEADER,
+    ReadYourWritesMiddleware,
+    parse_last_write,
+    read_router,
+    sign_last_write,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def replica(db, monkeypatch):
+    """Route reads as if a caught-up replica were configured."""
+    replica = Database(primary_database.url, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(read_router, "replica", replica)
+    monkeypatch.setattr(read_router, "lag_seconds", 0.0)
+    return replica
+
+
+@pytest.mark.usefixtures("replica")
+async def test_write_response_carries_last_write(make_user):
+    user_id = await make_user()
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+    
+    @app.post("/write")
+    async def write(db: AsyncSession = Depends(get_async_db)) -> dict:
+        track_user_writes(db, user_id)
+        await db.execute(update(User).where(User.id == user_id).values(bio="updated"))
+        await db.commit()
+        return {}
+    
+    @app.get("/read")
+    async def read(request: Request) -> dict:
+        return {"last_write": parse_last_write(request.headers.get(LAST_WRITE_HEADER), user_id)}
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/write")
+        last_write = response.headers.get(LAST_WRITE_HEADER)
+        echoed = (await client.get("/read", headers={LAST_WRITE_HEADER: last_write or ""})).json()
+        unchanged = await client.get("/read")
+    
+    assert last_write is not None
+    assert abs(echoed["last_write"] - time.time()) < 5
+    assert LAST_WRITE_HEADER not in unchanged.headers
+
+
+async def test_last_write_routes_to_primary_in_any_process(make_user, replica):
+    user_id = await make_user()
+    other_user_id = await make_user()
+    now = time.time()
+    
+    # A process that never saw the write only has the client's header to go on
+    assert read_router.route(user_id) is replica
+    assert read_router.route(user_id, last_write=now) is primary_database
+    assert read_router.route(user_id, last_write=now - read_router.window_seconds - 1) is replica
+    
+    forged = sign_last_write(other_user_id, now)
+    assert parse_last_write(forged, user_id) is None
+    assert parse_last_write(sign_last_write(user_id, now), user_id) == pytest.approx(now, abs=0.001)
@@ -0,0 +1,60 @@
+"""
+Tests for token version bumps reaching every process.
+"""
+
+import httpx
+import pytest
+
+from app.auth.jwt_handler import create_token_pair
+from app.auth.principal import principal_claims
+from app.auth.principal_cache import principal_cache
+from app.auth.revocation import revocation_store
+from app.background import db_session
+from app.main import app
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_password_change_revokes_tokens_in_other_processes(make_user):
+    user_id = await make_user()
+    async with db_session() as session:
+        await revocation_store.load(session)
+    
+    async with db_session() as session:
+        assert await UserService(session).update_password(user_id, "N3w-Passw0rd!")
+    assert principal_cache.min_token_version(user_id) == 1
+    
+    # Another process has never seen the bump until its next sync
+    principal_cache.clear()
+    assert principal_cache.min_token_version(user_id) == 0
+    async with db_session() as session:
+        await revocation_store.sync(session)
+    assert principal_cache.min_token_version(user_id) == 1
+
+
+async def test_deleted_account_stays_revoked_after_restart(make_user):
+    user_id = await make_user()
+    async with db_session() as session:
+        assert await UserService(session).delete(user_id)
+    
+    principal_cache.clear()
+    async with db_session() as session:
+        await revocation_store.load(session)
+    assert principal_cache.min_token_version(user_id) == 1
+
+
+async def test_refresh_token_from_before_password_change_is_rejected(make_user):
+    user_id = await make_user()
+    async with db_session() as session:
+        user = await UserService(session).get_by_id(user_id)
+        stale = create_token_pair(user.id, claims=principal_claims(user))["refresh_token"]
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.post("/auth/refresh", params={"refresh_token": stale})).status_code == 200
+        
+        async with db_session() as session:
+            assert await UserService(session).update_password(user_id, "N3w-Passw0rd!")
+        
+        response = await client.post("/auth/refresh", params={"refresh_token": stale})
+    assert response.status_code == 401
@@ -0,0 +1,81 @@
+"""
+Tests for webhook inbox leasing.
+"""
+
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from app.background import db_session
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
+from app.services.webhook_service import WebhookInboxService, webhook_processor
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def inbox(db):
+    async with db_session() as session:
+        await session.execute(delete(WebhookEvent))
+        await session.commit()
+    yield
+    async with db_session() as session:
+        await session.execute(delete(WebhookEvent))
+        await session.commit()
+
+
+async def _enqueue(count: int) -> None:
+    async with db_session() as session:
+        for _ in range(count):
+            await WebhookInboxService(session).enqueue("test", f"test:{uuid4().hex}", {"event": "test"})
+
+
+async def _status(event_id) -> WebhookEventStatus:
+    async with db_session() as session:
+        return (
+            await session.execute(select(WebhookEvent.status).where(WebhookEvent.id == event_id))
+        ).scalar_one()
+
+
+async def test_claims_one_event_per_lease(inbox):
+    await _enqueue(3)
+    
+    async with db_session() as session:
+        service = WebhookInboxService(session)
+        claimed = [await service.claim(lease_seconds=300) for _ in range(4)]
+    
+    assert [claim is not None for claim in claimed] == [True, True, True, False]
+    assert len({claim[0] for claim in claimed[:3]}) == 3
+
+
+async def test_expired_lease_cannot_overwrite_new_claim(inbox):
+    await _enqueue(1)
+    
+    async with db_session() as session:
+        service = WebhookInboxService(session)
+        event_id, _, stale_attempt = await service.claim(lease_seconds=0)
+        # The lease ran out and another worker claimed the event
+        reclaimed_id, _, attempt = await service.claim(lease_seconds=300)
+        assert reclaimed_id == event_id and attempt == stale_attempt + 1
+        
+        await service.mark_failed(event_id, stale_attempt, "timed out", retry_in=None)
+        assert await _status(event_id) == WebhookEventStatus.PROCESSING
+        
+        await service.mark_processed(event_id, attempt)
+        assert await _status(event_id) == WebhookEventStatus.PROCESSED
+
+
+async def test_unknown_reference_is_not_retried(inbox):
+    async with db_session() as session:
+        await WebhookInboxService(session).enqueue(
+            "paystack",
+            f"paystack:charge.success:{uuid4().hex}",
+            {"event": "charge.success", "data": {"reference": f"unknown_{uuid4().hex}"}},
+        )
+        event_id, payload, attempt = await WebhookInboxService(session).claim(lease_seconds=300)
+    
+    await webhook_processor._process(event_id, payload, attempt)
+    
+    assert await _status(event_id) == WebhookEventStatus.PROCESSED
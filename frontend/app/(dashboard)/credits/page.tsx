@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useRouter, useSearchParams } from 'next/navigation';
 import { 
   Coins, 
@@ -30,6 +30,7 @@ import {
   getCreditHistory,
   initializePayment,
   verifyPayment,
+  waitForPaymentStatus,
   CreditPackage,
   CreditBalance,
   CreditTransaction
@@ -48,6 +49,8 @@ export default function CreditsPage() {
   const [showVerifyDialog, setShowVerifyDialog] = useState(false);
   const [verifyStatus, setVerifyStatus] = useState<'loading' | 'success' | 'error'>('loading');
   const [verifyMessage, setVerifyMessage] = useState('');
+  // One Idempotency-Key per purchase attempt, so double-clicks create one payment
+  const purchaseKeys = useRef<Record<string, string>>({});
 
   // Check for payment verification on mount
   useEffect(() => {
@@ -95,8 +98,9 @@ export default function CreditsPage() {
 
   const handlePurchase = async (pkg: CreditPackage) => {
     setPurchasing(pkg.slug);
+    const idempotencyKey = purchaseKeys.current[pkg.slug] ??= crypto.randomUUID();
     try {
-      const response = await initializePayment(pkg.slug);
+      const response = await initializePayment(pkg.slug, undefined, idempotencyKey);
       // Redirect to Paystack
       window.location.href = response.authorization_url;
     } catch (error: any) {
@@ -105,6 +109,7 @@ export default function CreditsPage() {
         description: error.message || "Failed to initialize payment. Please try again.",
         variant: "destructive",
       });
+      delete purchaseKeys.current[pkg.slug];
       setPurchasing(null);
     }
   };
@@ -115,7 +120,16 @@ export default function CreditsPage() {
     setVerifyMessage('Verifying your payment...');
     
     try {
-      const result = await verifyPayment(reference);
+      let result = await verifyPayment(reference);
+      
+      if (!result.success && result.payment?.status === 'pending') {
+        // Wait for the webhook to settle it rather than polling the gateway
+        setVerifyMessage('Waiting for payment confirmation...');
+        const settled = await waitForPaymentStatus(reference);
+        if (settled && settled.status !== 'pending') {
+          result = await verifyPayment(reference);
+        }
+      }
       
       if (result.success) {
         setVerifyStatus('success');
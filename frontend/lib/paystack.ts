@@ -7,6 +7,22 @@ import { supabase } from './supabase';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// Signed marker the API returns after a write; echoing it on reads lets any
+// server process route them to the primary database while the replica catches up
+const LAST_WRITE_HEADER = 'X-Last-Write';
+let lastWrite: string | null = null;
+
+function rememberLastWrite(response: Response): void {
+  const value = response.headers.get(LAST_WRITE_HEADER);
+  if (value) {
+    lastWrite = value;
+  }
+}
+
+function lastWriteHeaders(): Record<string, string> {
+  return lastWrite ? { [LAST_WRITE_HEADER]: lastWrite } : {};
+}
+
 export interface CreditPackage {
   id: string;
   name: string;
@@ -33,10 +49,17 @@ export interface PaymentInitializeResponse {
 export interface PaymentVerifyResponse {
   success: boolean;
   message: string;
+  payment?: { status: string; credits_purchased: number };
   credits_added: number;
   new_balance: number;
 }
 
+export interface PaymentStatusEvent {
+  reference: string;
+  status: 'pending' | 'processing' | 'success' | 'failed' | 'refunded' | 'cancelled';
+  credits_purchased: number;
+}
+
 export interface CreditBalance {
   balance: number;
   lifetime_earned: number;
@@ -82,7 +105,8 @@ export async function getCreditPackages(): Promise<CreditPackage[]> {
  */
 export async function initializePayment(
   packageSlug: string,
-  callbackUrl?: string
+  callbackUrl?: string,
+  idempotencyKey?: string
 ): Promise<PaymentInitializeResponse> {
   const { data: { session } } = await supabase.auth.getSession();
   
@@ -95,12 +119,14 @@ export async function initializePayment(
     headers: {
       'Content-Type': 'application/json',
       'Authorization': `Bearer ${session.access_token}`,
+      ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
     },
     body: JSON.stringify({
       package_slug: packageSlug,
       callback_url: callbackUrl || `${window.location.origin}/credits?verify=1`,
     }),
   });
+  rememberLastWrite(response);
 
   if (!response.ok) {
     const error = await response.json();
@@ -126,6 +152,7 @@ export async function verifyPayment(reference: string): Promise<PaymentVerifyRes
       'Authorization': `Bearer ${session.access_token}`,
     },
   });
+  rememberLastWrite(response);
 
   if (!response.ok) {
     const error = await response.json();
@@ -135,6 +162,52 @@ export async function verifyPayment(reference: string): Promise<PaymentVerifyRes
   return response.json();
 }
 
+/**
+ * Wait for a pending payment to settle.
+ * Follows the server's status stream instead of polling verification,
+ * and resolves with the last status seen when the stream closes.
+ */
+export async function waitForPaymentStatus(reference: string): Promise<PaymentStatusEvent | null> {
+  const { data: { session } } = await supabase.auth.getSession();
+  
+  if (!session?.access_token) {
+    throw new Error('Not authenticated');
+  }
+
+  const response = await fetch(`${API_BASE_URL}/payments/${reference}/events`, {
+    method: 'GET',
+    headers: {
+      'Accept': 'text/event-stream',
+      'Authorization': `Bearer ${session.access_token}`,
+    },
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error('Failed to follow payment status');
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let latest: PaymentStatusEvent | null = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop() ?? '';
+    for (const message of messages) {
+      const data = message.split('\n').find((line) => line.startsWith('data: '));
+      if (data) {
+        latest = JSON.parse(data.slice('data: '.length));
+      }
+    }
+  }
+
+  return latest;
+}
+
 /**
  * Get user's credit balance
  */
@@ -149,6 +222,7 @@ export async function getCreditBalance(): Promise<CreditBalance> {
     method: 'GET',
     headers: {
       'Authorization': `Bearer ${session.access_token}`,
+      ...lastWriteHeaders(),
     },
   });
 
@@ -173,6 +247,7 @@ export async function getCreditHistory(page: number = 1, pageSize: number = 20):
     method: 'GET',
     headers: {
       'Authorization': `Bearer ${session.access_token}`,
+      ...lastWriteHeaders(),
     },
   });
 
@@ -215,6 +290,7 @@ export async function getPaymentHistory(page: number = 1, pageSize: number = 20)
     method: 'GET',
     headers: {
       'Authorization': `Bearer ${session.access_token}`,
+      ...lastWriteHeaders(),
     },
   });
 